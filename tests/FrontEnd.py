@@ -1,14 +1,33 @@
+import argparse
 import asyncio
 import base64
+import contextlib
+import copy
+import hashlib
+import html
+import io
+import json
 import logging
+import multiprocessing
 import os
 import platform
+import queue
 import re
 import shutil
+import statistics
 import subprocess
 import tempfile
+import threading
+import time
 import uuid
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
 from datetime import datetime
+from urllib.parse import parse_qsl, unquote, urlencode, urlparse
 import sys
 import nest_asyncio
 import cv2
@@ -18,6 +37,7 @@ import pyotp
 import soundfile as sf
 import requests
 from agixtsdk import AGiXTSDK
+from IPython import get_ipython
 from IPython.display import Image, display
 from playwright.async_api import async_playwright
 from pyzbar.pyzbar import decode
@@ -28,6 +48,8 @@ logging.basicConfig(
 )
 openai.base_url = os.getenv("EZLOCALAI_URI")
 openai.api_key = os.getenv("EZLOCALAI_API_KEY", "none")
+# Directory of this file, state files live here whatever the working directory is
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
 
 
 async def print_args(msg):
@@ -45,375 +67,3293 @@ def is_desktop():
     return not platform.system() == "Linux"
 
 
-class FrontEndTest:
-
-    def __init__(
-        self,
-        base_uri: str = "http://localhost:3437",
-        features: str = "",
-    ):
-        self.base_uri = base_uri
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.screenshots_dir = os.path.join("test_screenshots", f"test_run_{timestamp}")
-        os.makedirs(self.screenshots_dir, exist_ok=True)
-        self.browser = None
-        self.context = None
-        self.page = None
-        self.popup = None
-        self.playwright = None
-        self.screenshots_with_actions = []
-        self.agixt = AGiXTSDK(base_uri="https://api.agixt.dev")
-        self.agixt.register_user(
-            email=f"{uuid.uuid4()}@example.com", first_name="Test", last_name="User"
+def write_concat_list(frames_with_durations, list_path):
+    """
+    Writes an FFMPEG concat demuxer list that shows each image for its duration.
+
+    Args:
+        frames_with_durations (list): (image_path, duration_seconds) pairs in display order
+        list_path (str): Path of the list file to write
+    """
+
+    def quote(path):
+        return "'" + os.path.abspath(path).replace("'", "'\\''") + "'"
+
+    with open(list_path, "w") as list_file:
+        for image_path, duration in frames_with_durations:
+            list_file.write(f"file {quote(image_path)}\nduration {duration:.3f}\n")
+        # The concat demuxer ignores the duration of the final entry unless it is repeated
+        list_file.write(f"file {quote(frames_with_durations[-1][0])}\n")
+
+
+def canvas_filter(size):
+    """Returns an FFMPEG filter that fits every frame into the same even-sized canvas"""
+    width, height = (dimension - dimension % 2 for dimension in size)
+    return (
+        f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,format=yuv420p"
+    )
+
+
+def pad_narration(narration):
+    """
+    Adds trailing silence to a narration clip and returns (clip, segment_length).
+
+    Clips that failed to synthesize (None) get a silent 2 second segment.
+    """
+    if narration is None:
+        return None, 2.0
+    audio_data, sample_rate = narration
+    # Add small silence padding at the end (0.5 seconds)
+    audio_data = np.pad(audio_data, (0, int(0.5 * sample_rate)), mode="constant")
+    return (audio_data, sample_rate), max(len(audio_data) / sample_rate, 2.0)
+
+
+def write_narration_track(clips, segment_lengths, audio_path):
+    """
+    Writes narration clips to a single WAV file, each padded to its segment length so the
+    narration stays in sync with its screenshot.
+
+    Args:
+        clips (list): (audio_data, sample_rate) per segment, or None for silent segments
+        segment_lengths (list): Display duration of each segment in seconds
+        audio_path (str): Destination WAV path
+
+    Returns:
+        bool: False if there was no audio to write
+    """
+    synthesized_audio = [clip for clip in clips if clip is not None]
+    if not synthesized_audio:
+        return False
+    # Use the sample rate from the first audio clip
+    target_sample_rate = synthesized_audio[0][1]
+
+    # Resample all audio to match the first clip's sample rate if needed
+    resampled_audio = []
+    for clip, segment_length in zip(clips, segment_lengths):
+        if clip is None:
+            resampled = np.zeros(0)
+        elif clip[1] != target_sample_rate:
+            # You might need to add a resampling library like librosa here
+            # resampled = librosa.resample(audio_data, orig_sr=sr, target_sr=target_sample_rate)
+            resampled = clip[0]  # Placeholder for actual resampling
+        else:
+            resampled = clip[0]
+        segment_samples = int(segment_length * target_sample_rate)
+        if len(resampled) < segment_samples:
+            resampled = np.pad(
+                resampled, (0, segment_samples - len(resampled)), mode="constant"
+            )
+        resampled_audio.append(resampled)
+
+    # Write with the correct sample rate
+    sf.write(audio_path, np.concatenate(resampled_audio), target_sample_rate)
+    return True
+
+
+def video_bitrate_budget(max_size_mb, duration, audio_kbps=128, headroom=0.92):
+    """
+    Returns the video bitrate in kbps that keeps duration seconds of video and audio under max_size_mb.
+
+    Args:
+        max_size_mb (float): Target file size in MB
+        duration (float): Total video duration in seconds
+        audio_kbps (int): Bitrate reserved for the audio track
+        headroom (float): Fraction of the size budget available to the streams, leaving room for container overhead
+    """
+    total_kbps = max_size_mb * 1024 * 1024 * 8 * headroom / 1000 / max(duration, 1.0)
+    return max(int(total_kbps - audio_kbps), 50)
+
+
+def encode_still_video(
+    list_path,
+    audio_path,
+    output_path,
+    size,
+    crf=23,
+    video_kbps=None,
+    two_pass=False,
+    timings=None,
+):
+    """
+    Encodes a concat list of still images and an optional narration track to H.264.
+
+    Frames keep their listed durations instead of being duplicated to a fixed frame rate,
+    and every frame is fitted into the same even-sized canvas. With video_kbps the encode
+    is constant quality capped at that bitrate, or a two-pass average bitrate encode when
+    two_pass is set.
+
+    Args:
+        list_path (str): FFMPEG concat list from write_concat_list
+        audio_path (str): Narration WAV file, skipped if it does not exist
+        output_path (str): Destination MP4 path
+        size (tuple): (width, height) of the output canvas
+        crf (int): Compression quality (18-28 is good, higher = more compression)
+        video_kbps (int): Video bitrate budget in kbps
+        two_pass (bool): Use two-pass average bitrate encoding at video_kbps
+        timings (dict): Receives the seconds each FFMPEG pass took as ffmpeg_pass_1 and ffmpeg_pass_2
+
+    Returns:
+        int: Number of FFMPEG passes run
+    """
+    has_audio = bool(audio_path) and os.path.exists(audio_path)
+    video_args = [
+        "-vf",
+        canvas_filter(size),
+        "-vsync",
+        "vfr",
+        "-c:v",
+        "libx264",  # Use H.264 codec
+        "-tune",
+        "stillimage",
+        "-preset",
+        "medium",  # Encoding speed preset
+    ]
+    if two_pass and video_kbps:
+        video_args += ["-b:v", f"{video_kbps}k"]
+        passlog_prefix = f"{list_path}.passlog"
+        start = time.perf_counter()
+        subprocess.run(
+            ["ffmpeg", "-f", "concat", "-safe", "0", "-i", list_path]
+            + video_args
+            + ["-pass", "1", "-passlogfile", passlog_prefix, "-an", "-f", "mp4"]
+            + [os.devnull, "-y", "-loglevel", "error"]
         )
-        # Features are comma separated, options are:
-        # - stripe
-        # - email
-        # - google
-        if features == "":
-            features = os.environ.get("features", "")
-        if features == "":
-            self.features = []
-        elif "," in features:
-            self.features = features.split(",")
+        if timings is not None:
+            timings["ffmpeg_pass_1"] = time.perf_counter() - start
+        video_args += ["-pass", "2", "-passlogfile", passlog_prefix]
+        passes = 2
+    else:
+        video_args += ["-crf", str(crf)]
+        if video_kbps:
+            video_args += [
+                "-maxrate",
+                f"{video_kbps}k",
+                "-bufsize",
+                f"{video_kbps * 2}k",
+            ]
+        passes = 1
+    command = ["ffmpeg", "-f", "concat", "-safe", "0", "-i", list_path]
+    if has_audio:
+        command += ["-i", audio_path]
+    command += video_args
+    if has_audio:
+        command += ["-c:a", "aac", "-b:a", "128k"]  # Compress audio bitrate
+    command += [
+        "-movflags",
+        "+faststart",
+        output_path,
+        "-y",
+        "-loglevel",
+        "error",
+    ]
+    start = time.perf_counter()
+    subprocess.run(command)
+    if timings is not None:
+        timings[f"ffmpeg_pass_{passes}"] = time.perf_counter() - start
+    return passes
+
+
+def perceptual_hash(image, hash_size=32):
+    """
+    Returns the difference hash (dHash) of an image as a flat boolean array.
+
+    Args:
+        image (ndarray): Grayscale or BGR image
+        hash_size (int): Width and height of the hash grid, the hash has hash_size squared bits
+    """
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    return (small[:, 1:] > small[:, :-1]).flatten()
+
+
+def group_similar_frames(frame_paths, max_distance=6):
+    """
+    Groups runs of consecutive, visually near identical frames by their perceptual hash.
+
+    Args:
+        frame_paths (list): Screenshot paths in display order
+        max_distance (int): Most differing hash bits for two frames to count as the same. Negative disables grouping.
+
+    Returns:
+        list: Lists of frame indexes, one list per run of similar frames
+    """
+    groups = []
+    previous = None
+    for idx, frame_path in enumerate(frame_paths):
+        image = cv2.imread(frame_path, cv2.IMREAD_GRAYSCALE)
+        frame_hash = None if image is None else perceptual_hash(image)
+        if (
+            groups
+            and max_distance >= 0
+            and frame_hash is not None
+            and previous is not None
+            and np.count_nonzero(frame_hash != previous) <= max_distance
+        ):
+            groups[-1].append(idx)
         else:
-            self.features = [features]
-        if "," in features:
-            self.features = features.split(",")
+            groups.append([idx])
+        previous = frame_hash
+    return groups
+
+
+def fit_region(region, image_size, aspect, min_fraction=0.5, margin=0.05):
+    """
+    Grows a region to the canvas aspect ratio and a minimum size, keeping it inside the image.
+
+    Args:
+        region (dict): {"x", "y", "width", "height"} area in image pixels
+        image_size (tuple): (width, height) of the image
+        aspect (float): Width over height of the output canvas
+        min_fraction (float): Smallest share of the image width the region may be zoomed to
+        margin (float): Padding around the region as a share of the image size
+
+    Returns:
+        tuple: (x, y, width, height) integer crop inside the image
+    """
+    image_width, image_height = image_size
+    width = region["width"] + 2 * margin * image_width
+    height = region["height"] + 2 * margin * image_height
+    width = max(width, height * aspect, min_fraction * image_width)
+    height = width / aspect
+    if height > image_height:
+        height = image_height
+        width = height * aspect
+    width = min(width, image_width)
+    center_x = region["x"] + region["width"] / 2
+    center_y = region["y"] + region["height"] / 2
+    x = int(min(max(center_x - width / 2, 0), image_width - width))
+    y = int(min(max(center_y - height / 2, 0), image_height - height))
+    return x, y, int(width), int(height)
+
+
+def changed_region(previous, image, threshold=25):
+    """
+    Returns the bounding box of the pixels that changed between two frames, or None if none did.
+
+    Args:
+        previous (ndarray): Earlier BGR frame
+        image (ndarray): Later BGR frame of the same size
+        threshold (int): Smallest grayscale difference counted as a change
+    """
+    if previous is None or previous.shape != image.shape:
+        return None
+    difference = cv2.absdiff(
+        cv2.cvtColor(previous, cv2.COLOR_BGR2GRAY),
+        cv2.cvtColor(image, cv2.COLOR_BGR2GRAY),
+    )
+    ys, xs = np.nonzero(difference > threshold)
+    if len(xs) == 0:
+        return None
+    return {
+        "x": int(xs.min()),
+        "y": int(ys.min()),
+        "width": int(xs.max() - xs.min() + 1),
+        "height": int(ys.max() - ys.min() + 1),
+    }
+
+
+def image_format(image_bytes):
+    """Returns "png", "jpeg" or "webp" for encoded image bytes"""
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "webp"
+    if image_bytes[:2] == b"\xff\xd8":
+        return "jpeg"
+    return "png"
+
+
+def materialize_frames(frames, directory):
+    """
+    Returns a file path for every frame, writing frames held as encoded bytes into directory.
+
+    Args:
+        frames (list): Screenshot file paths or encoded image bytes
+        directory (str): Directory for frames that only exist in memory
+    """
+    frame_paths = []
+    for idx, frame in enumerate(frames):
+        if isinstance(frame, bytes):
+            frame_path = os.path.join(directory, f"frame_{idx}.{image_format(frame)}")
+            with open(frame_path, "wb") as frame_file:
+                frame_file.write(frame)
+            frame = frame_path
+        frame_paths.append(frame)
+    return frame_paths
+
+
+def clean_action_name(action_name):
+    """Turns an action name into readable narration or caption text"""
+    cleaned_action = action_name.replace("_", " ")
+    return re.sub(r"([a-z])([A-Z])", r"\1 \2", cleaned_action)
+
+
+def caption_duration(text, chars_per_second=15.0, padding=0.5):
+    """
+    Returns how long a captioned frame is shown, derived from the caption's reading time.
+
+    Args:
+        text (str): Caption text
+        chars_per_second (float): Reading speed
+        padding (float): Pause after the caption in seconds, like the silence after a narration clip
+    """
+    return max(len(text) / chars_per_second + padding, 2.0)
+
+
+def burn_caption(image_bytes, text):
+    """
+    Returns the encoded image with the caption drawn over a dark band at the bottom.
+
+    Args:
+        image_bytes (bytes): Encoded PNG, JPEG or WebP screenshot
+        text (str): Caption text
+    """
+    image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    height, width = image.shape[:2]
+    font, scale, thickness = cv2.FONT_HERSHEY_SIMPLEX, max(width / 1367, 0.4), 2
+    margin = int(20 * scale)
+    lines = []
+    for word in text.split():
+        candidate = f"{lines[-1]} {word}" if lines else word
+        fits = (
+            cv2.getTextSize(candidate, font, scale, thickness)[0][0]
+            <= width - 2 * margin
+        )
+        if lines and fits:
+            lines[-1] = candidate
         else:
-            if features != "":
-                self.features = [features]
-
-    async def take_screenshot(self, action_name, no_sleep=False):
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        sanitized_action_name = re.sub(r"[^a-zA-Z0-9_-]", "_", action_name)
-        screenshot_path = os.path.join(
-            self.screenshots_dir, f"{timestamp}_{sanitized_action_name}.png"
+            lines.append(word)
+    line_height = cv2.getTextSize("Ag", font, scale, thickness)[0][1] + margin // 2
+    band_top = max(height - len(lines) * line_height - margin, 0)
+    band = image[band_top:]
+    image[band_top:] = (band * 0.3).astype(np.uint8)
+    for idx, line in enumerate(lines):
+        cv2.putText(
+            image,
+            line,
+            (margin, band_top + (idx + 1) * line_height),
+            font,
+            scale,
+            (255, 255, 255),
+            thickness,
+            cv2.LINE_AA,
         )
-        logging.info(
-            f"[{timestamp}] Action: {action_name} - Screenshot path: {screenshot_path}"
+    extension = {"png": ".png", "jpeg": ".jpg", "webp": ".webp"}[
+        image_format(image_bytes)
+    ]
+    return cv2.imencode(extension, image)[1].tobytes()
+
+
+class FrameStore:
+    """
+    Bounded in-memory buffer of captured screenshots keyed by screenshot path.
+
+    Screenshots are only written to disk when keep_screenshots is set, or when the buffer
+    grows past max_size_mb, in which case the oldest frames are spilled to their paths.
+
+    Args:
+        max_size_mb (float): Memory budget for buffered frames. Defaults to FRAME_STORE_MAX_MB or 256.
+        keep_screenshots (bool): Write every screenshot to disk as it is captured. Defaults to KEEP_SCREENSHOTS, or true outside CI.
+    """
+
+    def __init__(self, max_size_mb=None, keep_screenshots=None):
+        if max_size_mb is None:
+            max_size_mb = float(os.getenv("FRAME_STORE_MAX_MB", "256"))
+        if keep_screenshots is None:
+            keep_screenshots = (
+                os.getenv(
+                    "KEEP_SCREENSHOTS", "false" if os.getenv("CI") else "true"
+                ).lower()
+                == "true"
+            )
+        self.max_size_mb = max_size_mb
+        self.keep_screenshots = keep_screenshots
+        self.frames = {}
+        self.size = 0
+
+    def add(self, path, image_bytes):
+        if self.keep_screenshots:
+            with open(path, "wb") as frame_file:
+                frame_file.write(image_bytes)
+            return
+        self.frames[path] = image_bytes
+        self.size += len(image_bytes)
+        # Spill the oldest frames to disk once the buffer is over budget
+        while self.size > self.max_size_mb * 1024 * 1024 and len(self.frames) > 1:
+            oldest_path = next(iter(self.frames))
+            oldest = self.frames.pop(oldest_path)
+            with open(oldest_path, "wb") as frame_file:
+                frame_file.write(oldest)
+            self.size -= len(oldest)
+
+    def snapshot(self, path):
+        """Returns the frame's bytes while it is buffered, otherwise its path on disk"""
+        return self.frames.get(path, path)
+
+    def get(self, path):
+        """Returns the encoded bytes of a frame"""
+        if path in self.frames:
+            return self.frames[path]
+        with open(path, "rb") as frame_file:
+            return frame_file.read()
+
+    def clear(self):
+        self.frames = {}
+        self.size = 0
+
+
+class StreamingReportEncoder:
+    """
+    Encodes a report video in the background while the scenario is still running.
+
+    Each frame handed to add_frame starts its narration right away. A worker thread waits
+    for the narrations in order and pipes every frame to a long-running FFMPEG process for
+    the length of its narration, so finish() only has to mux the narration track onto the
+    already encoded video.
+
+    In captions mode frames get their action name burned in and are shown for its reading
+    time instead, and no narration is synthesized.
+
+    Args:
+        narrate (callable): Returns (audio_data, sample_rate) for an action name, or None on failure
+        concurrency (int): Number of narration clips synthesized in parallel
+        fps (int): Frame rate of the streamed video, which sets the timing granularity of each frame
+        captions (bool): Caption frames instead of narrating them
+        width (int): Width the video is scaled down to, 0 keeps the screenshot width
+    """
+
+    def __init__(self, narrate, concurrency=4, fps=4, captions=False, width=0):
+        self.narrate = narrate
+        self.captions = captions
+        self.width = width
+        self.fps = fps
+        self.temp_dir = tempfile.mkdtemp()
+        self.video_path = os.path.join(self.temp_dir, "stream.mp4")
+        self.narration_executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+        self.frames = queue.Queue()
+        self.clips = []
+        self.segment_lengths = []
+        self.process = None
+        self.error = None
+        self.worker = threading.Thread(target=self.encode_frames, daemon=True)
+        self.worker.start()
+
+    def add_frame(self, image_bytes, action_name):
+        """Queues an encoded screenshot and starts synthesizing its narration"""
+        if self.captions:
+            self.frames.put((image_bytes, None, clean_action_name(action_name)))
+            return
+        self.frames.put(
+            (
+                image_bytes,
+                self.narration_executor.submit(self.narrate, action_name),
+                action_name,
+            )
         )
-        target = self.popup if self.popup else self.page
-        logging.info(
-            f"Screenshotting { 'popup' if self.popup else 'page'} at {target.url}"
+
+    def start_encoder(self, image_bytes):
+        first_img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+        height, width = first_img.shape[:2]
+        if 0 < self.width < width:
+            width, height = self.width, round(height * self.width / width)
+        self.process = subprocess.Popen(
+            [
+                "ffmpeg",
+                "-f",
+                "image2pipe",
+                "-c:v",
+                {"png": "png", "jpeg": "mjpeg", "webp": "webp"}[
+                    image_format(image_bytes)
+                ],
+                "-framerate",
+                str(self.fps),
+                "-i",
+                "-",
+                "-vf",
+                canvas_filter((width, height)),
+                "-c:v",
+                "libx264",
+                "-tune",
+                "stillimage",
+                "-crf",
+                "23",
+                "-preset",
+                "veryfast",
+                self.video_path,
+                "-y",
+                "-loglevel",
+                "error",
+            ],
+            stdin=subprocess.PIPE,
         )
-        if not no_sleep:
-            await target.wait_for_timeout(2000)
 
-        await target.screenshot(path=screenshot_path)
+    def encode_frames(self):
+        while True:
+            item = self.frames.get()
+            if item is None:
+                break
+            if self.error:
+                continue
+            image_bytes, narration, action_name = item
+            try:
+                if narration is None:
+                    image_bytes = burn_caption(image_bytes, action_name)
+                    clip, segment_length = None, caption_duration(action_name)
+                else:
+                    clip, segment_length = pad_narration(narration.result())
+                frame_count = max(1, round(segment_length * self.fps))
+                if self.process is None:
+                    self.start_encoder(image_bytes)
+                for _ in range(frame_count):
+                    self.process.stdin.write(image_bytes)
+                self.clips.append(clip)
+                # Keep the narration aligned with the frame grid of the streamed video
+                self.segment_lengths.append(frame_count / self.fps)
+            except Exception as e:
+                logging.error(f"Streaming report encoder failed: {e}")
+                self.error = e
+
+    def stop(self):
+        self.frames.put(None)
+        self.worker.join()
+        self.narration_executor.shutdown(wait=False)
+        if self.process:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+            self.process.wait()
 
-        if not os.path.exists(screenshot_path):
-            raise Exception(f"Failed to capture screenshot on action: {action_name}")
+    def finish(self, output_path):
+        """
+        Waits for queued frames, then muxes the narration onto the streamed video.
 
-        # Add screenshot and action to the list
-        self.screenshots_with_actions.append((screenshot_path, action_name))
+        Returns:
+            str: output_path, or None if the stream could not be completed
+        """
+        try:
+            self.stop()
+            if self.error or self.process is None or self.process.returncode != 0:
+                return None
+            audio_path = os.path.join(self.temp_dir, "combined_audio.wav")
+            command = ["ffmpeg", "-i", self.video_path]
+            if write_narration_track(self.clips, self.segment_lengths, audio_path):
+                command += ["-i", audio_path, "-c:a", "aac", "-b:a", "128k"]
+            command += [
+                "-c:v",
+                "copy",
+                "-movflags",
+                "+faststart",
+                output_path,
+                "-y",
+                "-loglevel",
+                "error",
+            ]
+            subprocess.run(command)
+            return output_path if os.path.exists(output_path) else None
+        finally:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def close(self):
+        """Discards the stream without producing a video"""
+        self.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+
+# Installed in every document so settle detection can see when the DOM last changed
+SETTLE_OBSERVER_SCRIPT = """() => {
+    if (window.__settleState) return;
+    const state = { lastMutation: performance.now() };
+    window.__settleState = state;
+    new MutationObserver(() => {
+        state.lastMutation = performance.now();
+    }).observe(document, {
+        subtree: true,
+        childList: true,
+        attributes: true,
+        characterData: true,
+    });
+}"""
+
+SETTLE_STATE_SCRIPT = """() => {
+    const state = window.__settleState;
+    // Infinite animations such as spinners never finish, so only finite ones hold the page open
+    const animations = document.getAnimations
+        ? document.getAnimations().filter((animation) => {
+              if (animation.playState !== "running" || !animation.effect) return false;
+              return animation.effect.getComputedTiming().iterations !== Infinity;
+          }).length
+        : 0;
+    return {
+        installed: Boolean(state),
+        quietFor: state ? performance.now() - state.lastMutation : 0,
+        animations: animations,
+        readyState: document.readyState,
+    };
+}"""
+
+
+class PageSettler:
+    """
+    Waits for pages to become quiescent instead of sleeping for a fixed time.
+
+    A page is settled once it has no in-flight requests, its DOM has not mutated for
+    quiet_ms and no finite CSS animations are running. Every wait is capped at max_wait
+    seconds and recorded in timings. A test step settles up to three times, so callers
+    share step_max_wait seconds between the waits of one step.
+
+    Args:
+        quiet_ms (int): How long the DOM must stay unchanged. Defaults to SETTLE_QUIET_MS or 500.
+        max_wait (float): Upper bound for a single wait in seconds. Defaults to SETTLE_MAX_WAIT or 10.
+        step_max_wait (float): Upper bound for all waits of one test step in seconds. Defaults to SETTLE_STEP_MAX_WAIT or 15.
+    """
+
+    def __init__(self, quiet_ms=None, max_wait=None, step_max_wait=None):
+        self.quiet_ms = quiet_ms or int(os.getenv("SETTLE_QUIET_MS", "500"))
+        self.max_wait = max_wait or float(os.getenv("SETTLE_MAX_WAIT", "10"))
+        self.step_max_wait = step_max_wait or float(
+            os.getenv("SETTLE_STEP_MAX_WAIT", "15")
+        )
+        self.inflight = {}
+        self.timings = []
 
-        display(Image(filename=str(screenshot_path)))
-        return screenshot_path
+    async def attach(self, page):
+        """Starts tracking requests and DOM mutations on a page"""
+        if page in self.inflight:
+            return
+        inflight = set()
+        self.inflight[page] = inflight
+
+        def request_started(request):
+            # Long-lived streams never finish and would keep the page busy forever
+            if request.resource_type not in ("eventsource", "websocket"):
+                inflight.add(request)
+
+        page.on("request", request_started)
+        page.on("requestfinished", inflight.discard)
+        page.on("requestfailed", inflight.discard)
+        page.on("close", lambda _: self.inflight.pop(page, None))
+        await page.add_init_script(f"({SETTLE_OBSERVER_SCRIPT})()")
+        try:
+            await page.evaluate(SETTLE_OBSERVER_SCRIPT)
+        except Exception:
+            # The page is navigating, the init script covers the next document
+            pass
 
-    def send_video_to_discord(
-        self, video_path, demo_name, test_status="✅ Test passed"
-    ):
+    async def wait(self, page, label="", max_wait=None):
         """
-        Send a video to Discord with contextual information
+        Waits until the page is settled or max_wait runs out.
 
         Args:
-            video_path (str): Path to the video file
-            demo_name (str): Name of the demo/test for the message
-            test_status (str): Status prefix for the message
+            page (Page): Page to wait for
+            label (str): Description of the wait in timings
+            max_wait (float): Seconds left for this wait, such as the rest of a step's budget. Never more than the max_wait of the settler.
+
+        Returns:
+            float: Seconds spent waiting
         """
-        discord_webhook = os.getenv("DISCORD_WEBHOOK")
-        if not discord_webhook:
-            logging.warning(
-                "DISCORD_WEBHOOK environment variable not set, skipping Discord upload"
+        await self.attach(page)
+        inflight = self.inflight.get(page, set())
+        limit = self.max_wait if max_wait is None else min(max_wait, self.max_wait)
+        start = time.monotonic()
+        deadline = start + limit
+        settled = False
+        while True:
+            try:
+                state = await page.evaluate(SETTLE_STATE_SCRIPT)
+                if not state["installed"]:
+                    await page.evaluate(SETTLE_OBSERVER_SCRIPT)
+            except Exception:
+                # Execution context was destroyed by a navigation, check again shortly
+                state = None
+            if (
+                state
+                and state["installed"]
+                and state["readyState"] != "loading"
+                and state["quietFor"] >= self.quiet_ms
+                and state["animations"] == 0
+                and not inflight
+            ):
+                settled = True
+                break
+            if time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(0.1)
+        elapsed = time.monotonic() - start
+        self.timings.append({"label": label, "seconds": elapsed, "settled": settled})
+        if not settled:
+            logging.info(
+                f"Page did not settle within {limit:.1f}s ({label}), continuing"
             )
-            return
+        return elapsed
+
+
+class TimingTrace:
+    """
+    Records how long each phase of a test step or report stage takes.
 
+    Every record is appended as one JSON line of {"scenario", "step", "phase", "seconds", "at"}
+    to a trace file per scenario as soon as it is taken, so a run that crashes still leaves its
+    trace behind.
+    """
+
+    def __init__(self, trace_dir):
+        self.trace_dir = trace_dir
+        self.records = []
+        self.lock = threading.Lock()
+
+    def record(self, scenario, step, phase, seconds):
+        """
+        Adds a phase duration to the trace
+
+        Args:
+            scenario (str): Scenario or report the step belongs to
+            step (str): Test action or screenshot description
+            phase (str): Phase of the step, such as action or screenshot_capture
+            seconds (float): Time the phase took
+        """
+        entry = {
+            "scenario": scenario,
+            "step": step,
+            "phase": phase,
+            "seconds": round(seconds, 4),
+            "at": datetime.now().isoformat(),
+        }
+        with self.lock:
+            self.records.append(entry)
+            os.makedirs(self.trace_dir, exist_ok=True)
+            with open(os.path.join(self.trace_dir, f"{scenario}.jsonl"), "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    @contextlib.contextmanager
+    def phase(self, scenario, step, phase):
+        """Times the body of the with block as one phase, also when it raises"""
+        start = time.perf_counter()
         try:
-            # Get git information for better context
-            try:
-                branch_name = (
-                    subprocess.check_output(
-                        ["git", "rev-parse", "--abbrev-ref", "HEAD"],
-                        cwd=os.getcwd(),
-                        stderr=subprocess.DEVNULL,
-                    )
-                    .decode()
-                    .strip()
-                )
-            except:
-                branch_name = os.getenv("GITHUB_REF_NAME", "unknown")
+            yield
+        finally:
+            self.record(scenario, step, phase, time.perf_counter() - start)
 
-            try:
-                commit_hash = (
-                    subprocess.check_output(
-                        ["git", "rev-parse", "--short", "HEAD"],
-                        cwd=os.getcwd(),
-                        stderr=subprocess.DEVNULL,
-                    )
-                    .decode()
-                    .strip()
-                )
-            except:
-                commit_hash = os.getenv("GITHUB_SHA", "unknown")[:7]
+    def summary(self, top=10):
+        """
+        Returns a table of the phases and single steps that took the most wall time.
+        Phases can nest, e.g. a screenshot taken inside an action, so totals overlap.
+
+        Args:
+            top (int): Number of rows in each section
+        """
+        with self.lock:
+            records = list(self.records)
+        phases = {}
+        for record in records:
+            calls, seconds = phases.get(record["phase"], (0, 0.0))
+            phases[record["phase"]] = (calls + 1, seconds + record["seconds"])
+        lines = [
+            f"{'phase':<24}{'calls':>8}{'total s':>12}{'mean s':>10}",
+        ]
+        for phase, (calls, seconds) in sorted(
+            phases.items(), key=lambda item: -item[1][1]
+        )[:top]:
+            lines.append(
+                f"{phase:<24}{calls:>8}{seconds:>12.1f}{seconds / calls:>10.2f}"
+            )
+        lines.append("")
+        lines.append(f"{'seconds':>8}  {'scenario':<24}{'phase':<24}step")
+        for record in sorted(records, key=lambda record: -record["seconds"])[:top]:
+            lines.append(
+                f"{record['seconds']:>8.1f}  {record['scenario']:<24}{record['phase']:<24}{record['step'][:80]}"
+            )
+        return "\n".join(lines)
+
+
+BENCHMARK_OBSERVER_SCRIPT = """(() => {
+    const state = { longTasks: [], lcp: 0 };
+    window.__benchmarkState = state;
+    try {
+        new PerformanceObserver((list) => {
+            for (const entry of list.getEntries()) state.longTasks.push(entry.duration);
+        }).observe({ type: "longtask", buffered: true });
+        new PerformanceObserver((list) => {
+            const entries = list.getEntries();
+            state.lcp = entries[entries.length - 1].startTime;
+        }).observe({ type: "largest-contentful-paint", buffered: true });
+    } catch (e) {}
+})();"""
+
+BENCHMARK_METRICS_SCRIPT = """() => {
+    const navigation = performance.getEntriesByType("navigation")[0] || {};
+    const fcp = performance.getEntriesByName("first-contentful-paint")[0];
+    const state = window.__benchmarkState || { longTasks: [], lcp: 0 };
+    return {
+        ttfb: navigation.responseStart || 0,
+        dom_content_loaded: navigation.domContentLoadedEventEnd || 0,
+        load: navigation.loadEventEnd || 0,
+        transfer_kb: (navigation.transferSize || 0) / 1024,
+        fcp: fcp ? fcp.startTime : 0,
+        lcp: state.lcp,
+        long_tasks: state.longTasks.length,
+        long_task_ms: state.longTasks.reduce((total, duration) => total + duration, 0),
+    };
+}"""
+
+
+class RouteBenchmark:
+    """
+    Loads app routes repeatedly, cold in a fresh context and warm in a reused one, and
+    compares the median Navigation Timing, paint, long task and JS execution metrics of
+    each route against a stored baseline.
+
+    A metric regresses when its median exceeds the baseline by more than budget_pct percent
+    and by more than budget_min_ms, so noise on small values does not fail the run.
+
+    Args:
+        runs (int): Loads per route and mode. Defaults to BENCHMARK_RUNS or 5.
+        baseline_path (str): Baseline JSON file. Defaults to BENCHMARK_BASELINE_PATH or ~/.cache/agixt-interactive/route-baseline/route_baseline.json, which CI keeps between runs.
+        budget_pct (float): Allowed regression in percent. Defaults to BENCHMARK_BUDGET_PCT or 20.
+        budget_min_ms (float): Regressions below this many ms are ignored. Defaults to BENCHMARK_BUDGET_MIN_MS or 50.
+    """
+
+    ROUTES = [
+        "/user",
+        "/chat",
+        "/team",
+        "/user/subscribe",
+        "/settings/extensions",
+        "/settings/abilities",
+        "/settings/prompts",
+        "/settings/chains",
+        "/settings/training",
+    ]
+    # Metrics held to the budget, all in milliseconds
+    BUDGETED_METRICS = [
+        "ttfb",
+        "dom_content_loaded",
+        "load",
+        "fcp",
+        "lcp",
+        "long_task_ms",
+        "script_ms",
+    ]
+
+    def __init__(
+        self, runs=None, baseline_path=None, budget_pct=None, budget_min_ms=None
+    ):
+        self.runs = runs or int(os.getenv("BENCHMARK_RUNS", "5"))
+        self.baseline_path = baseline_path or os.getenv(
+            "BENCHMARK_BASELINE_PATH",
+            os.path.join(
+                os.path.expanduser("~"),
+                ".cache",
+                "agixt-interactive",
+                "route-baseline",
+                "route_baseline.json",
+            ),
+        )
+        self.budget_pct = budget_pct or float(os.getenv("BENCHMARK_BUDGET_PCT", "20"))
+        self.budget_min_ms = budget_min_ms or float(
+            os.getenv("BENCHMARK_BUDGET_MIN_MS", "50")
+        )
+        routes = os.getenv("BENCHMARK_ROUTES", "")
+        self.routes = [
+            route.strip() for route in routes.split(",") if route.strip()
+        ] or self.ROUTES
+
+    async def measure(self, page, url, settle):
+        """
+        Loads a URL on a page and returns its metrics for that load
+
+        Args:
+            page (Page): Page with BENCHMARK_OBSERVER_SCRIPT added as an init script
+            url (str): URL to load
+            settle (callable): Waits for the page to settle after load (async)
+        """
+        cdp = await page.context.new_cdp_session(page)
+        await cdp.send("Performance.enable")
+        before = await cdp.send("Performance.getMetrics")
+        await page.goto(url, wait_until="load")
+        await settle(page)
+        after = await cdp.send("Performance.getMetrics")
+        await cdp.detach()
+        metrics = await page.evaluate(BENCHMARK_METRICS_SCRIPT)
+        script_seconds = {
+            metric["name"]: metric["value"] for metric in after["metrics"]
+        }.get("ScriptDuration", 0) - {
+            metric["name"]: metric["value"] for metric in before["metrics"]
+        }.get(
+            "ScriptDuration", 0
+        )
+        metrics["script_ms"] = script_seconds * 1000
+        metrics["url"] = page.url
+        return metrics
+
+    async def run(self, browser, base_uri, storage_state, settle, context_options=None):
+        """
+        Benchmarks every route cold and warm and returns the median metrics per route and mode
 
+        Args:
+            browser (Browser): Chromium browser, CDP is needed for script timings
+            base_uri (str): Front end URI
+            storage_state (dict): Storage state of a logged in session
+            settle (callable): Waits for a page to settle after load (async)
+            context_options (dict): Extra options for new browser contexts
+        """
+        context_options = {"storage_state": storage_state, **(context_options or {})}
+        results = {}
+        for route in self.routes:
+            url = f"{base_uri}{route}"
+            samples = {"cold": [], "warm": []}
+            for _ in range(self.runs):
+                # A fresh context has an empty HTTP cache, so every load is cold
+                context = await browser.new_context(**context_options)
+                await context.add_init_script(BENCHMARK_OBSERVER_SCRIPT)
+                try:
+                    page = await context.new_page()
+                    samples["cold"].append(await self.measure(page, url, settle))
+                finally:
+                    await context.close()
+            context = await browser.new_context(**context_options)
+            await context.add_init_script(BENCHMARK_OBSERVER_SCRIPT)
             try:
-                commit_message = (
-                    subprocess.check_output(
-                        ["git", "log", "-1", "--pretty=%B"],
-                        cwd=os.getcwd(),
-                        stderr=subprocess.DEVNULL,
+                page = await context.new_page()
+                # Prime the cache once, then every load is warm
+                await page.goto(url, wait_until="load")
+                await settle(page)
+                for _ in range(self.runs):
+                    samples["warm"].append(await self.measure(page, url, settle))
+            finally:
+                await context.close()
+            results[route] = {}
+            for mode, mode_samples in samples.items():
+                results[route][mode] = {
+                    metric: statistics.median(sample[metric] for sample in mode_samples)
+                    for metric in mode_samples[0]
+                    if metric != "url"
+                }
+                redirected = {
+                    sample["url"]
+                    for sample in mode_samples
+                    if not sample["url"].split("?")[0].endswith(route)
+                }
+                if redirected:
+                    logging.warning(
+                        f"Benchmark of {route} ({mode}) ended on {', '.join(redirected)}"
                     )
-                    .decode()
-                    .strip()
-                )
-            except:
-                commit_message = os.getenv(
-                    "GITHUB_EVENT_HEAD_COMMIT_MESSAGE", "No commit message"
-                )
-
-            # Build the Discord message
-            repo_name = os.getenv("GITHUB_REPOSITORY", "Interactive")
-            actor = os.getenv("GITHUB_ACTOR", "local-user")
+            logging.info(
+                f"Benchmarked {route}: cold load {results[route]['cold']['load']:.0f}ms, warm load {results[route]['warm']['load']:.0f}ms, cold LCP {results[route]['cold']['lcp']:.0f}ms"
+            )
+        return results
 
-            # Format actor with proper Discord mentions if known
-            discord_mentions = {
-                "Josh-XT": "<@381837595522367488>",
-                "waiscodes": "<@670762167037067304>",
-                "birdup000": "<@856308374567256074>",
-                "Nick-XT": "<@381908912951001088>",
-            }
-            # check if failure, if it is, tag them, otherwise just use their name
-            if test_status != "✅ Test passed":
-                discord_name = discord_mentions.get(actor, f"**{actor}**")
-            else:
-                discord_name = f"**{actor}**"
-            message = f"{test_status}: **{demo_name}** on repository **{repo_name}** branch **{branch_name}** commit '{commit_message}' ({commit_hash}) by {discord_name}"
+    def compare(self, results, baseline):
+        """
+        Returns a description of every budgeted metric that regressed against the baseline
 
-            message = f"{test_status}: **{demo_name}** on repository **{repo_name}** branch **{branch_name}** commit '{commit_message}' ({commit_hash}) by {discord_name}"
+        Args:
+            results (dict): Median metrics from run
+            baseline (dict): Median metrics of the baseline run
+        """
+        regressions = []
+        for route, modes in results.items():
+            for mode, metrics in modes.items():
+                expected = baseline.get(route, {}).get(mode, {})
+                for metric in self.BUDGETED_METRICS:
+                    if metric not in expected or metric not in metrics:
+                        continue
+                    limit = max(
+                        expected[metric] * (1 + self.budget_pct / 100),
+                        expected[metric] + self.budget_min_ms,
+                    )
+                    if metrics[metric] > limit:
+                        regressions.append(
+                            f"{route} {mode} {metric}: {metrics[metric]:.0f}ms vs baseline {expected[metric]:.0f}ms (limit {limit:.0f}ms)"
+                        )
+        return regressions
 
-            # Send the video to Discord
-            with open(video_path, "rb") as video_file:
-                files = {"file": video_file}
-                data = {"content": message}
+    def check(self, results):
+        """
+        Compares results with the baseline file and raises on regressions. The baseline is
+        written when it does not exist yet, or replaced when BENCHMARK_UPDATE_BASELINE is true.
 
-                response = requests.post(
-                    discord_webhook, files=files, data=data, timeout=30
+        Args:
+            results (dict): Median metrics from run
+        """
+        with open(os.path.join(TESTS_DIR, "route_benchmark_results.json"), "w") as f:
+            json.dump(results, f, indent=2)
+        update = os.getenv("BENCHMARK_UPDATE_BASELINE", "").lower() == "true"
+        if os.path.exists(self.baseline_path) and not update:
+            with open(self.baseline_path, "r") as f:
+                regressions = self.compare(results, json.load(f))
+            if regressions:
+                raise Exception(
+                    "Route benchmark exceeded its budget:\n" + "\n".join(regressions)
                 )
+            logging.info(
+                f"Route benchmark within {self.budget_pct}% of baseline {self.baseline_path}"
+            )
+            return
+        os.makedirs(os.path.dirname(self.baseline_path), exist_ok=True)
+        with open(self.baseline_path, "w") as f:
+            json.dump(results, f, indent=2)
+        logging.info(f"Route benchmark baseline written to {self.baseline_path}")
+
+
+CHAT_STREAM_OBSERVER_SCRIPT = """() => {
+    const selector = ".chat-log-message-ai";
+    const aiChars = () =>
+        Array.from(document.querySelectorAll(selector)).reduce(
+            (total, element) => total + element.innerText.length,
+            0
+        );
+    const state = {
+        baseline: aiChars(),
+        sentAt: null,
+        firstContentAt: null,
+        lastUpdateAt: null,
+        chars: 0,
+        updates: [],
+        longTasks: [],
+    };
+    window.__chatStreamState = state;
+    // Playwright presses Enter as a real keydown, so this is when the user sent the message
+    document.addEventListener(
+        "keydown",
+        (event) => {
+            if (event.key === "Enter" && state.sentAt === null) state.sentAt = performance.now();
+        },
+        true
+    );
+    new MutationObserver(() => {
+        if (state.sentAt === null) return;
+        const chars = aiChars() - state.baseline;
+        if (chars <= state.chars) return;
+        const now = performance.now();
+        if (state.firstContentAt === null) state.firstContentAt = now;
+        state.lastUpdateAt = now;
+        state.chars = chars;
+        state.updates.push([now, chars]);
+    }).observe(document, { subtree: true, childList: true, characterData: true });
+    try {
+        new PerformanceObserver((list) => {
+            for (const entry of list.getEntries()) state.longTasks.push([entry.startTime, entry.duration]);
+        }).observe({ type: "longtask" });
+    } catch (e) {}
+}"""
+
+CHAT_STREAM_STATE_SCRIPT = """() => {
+    const state = window.__chatStreamState;
+    return state ? { ...state, now: performance.now() } : null;
+}"""
+
+
+def percentile(values, pct):
+    """
+    Returns the pct percentile of values with linear interpolation, or None without values
+
+    Args:
+        values (list): Numbers to take the percentile of
+        pct (float): Percentile between 0 and 100
+    """
+    values = sorted(values)
+    if not values:
+        return None
+    rank = (len(values) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+def chat_stream_metrics(state):
+    """
+    Turns the state recorded by CHAT_STREAM_OBSERVER_SCRIPT into latency and throughput metrics in ms
+
+    Args:
+        state (dict): State returned by CHAT_STREAM_STATE_SCRIPT once the answer completed
+    """
+    sent_at = state["sentAt"]
+    updates = state["updates"]
+    intervals = [later[0] - earlier[0] for earlier, later in zip(updates, updates[1:])]
+    streaming_seconds = (state["lastUpdateAt"] - state["firstContentAt"]) / 1000
+    long_tasks = [
+        duration
+        for start, duration in state["longTasks"]
+        if sent_at <= start <= state["lastUpdateAt"]
+    ]
+    return {
+        "ttft_ms": state["firstContentAt"] - sent_at,
+        "complete_ms": state["lastUpdateAt"] - sent_at,
+        "chars": state["chars"],
+        "updates": len(updates),
+        "update_interval_p50_ms": percentile(intervals, 50),
+        "update_interval_p95_ms": percentile(intervals, 95),
+        "chars_per_second": (
+            state["chars"] / streaming_seconds if streaming_seconds > 0 else None
+        ),
+        "long_tasks": len(long_tasks),
+        "long_task_ms": sum(long_tasks),
+        "long_task_max_ms": max(long_tasks, default=0),
+    }
+
+
+class ChatStreamBenchmark:
+    """
+    Sends the same chat prompt repeatedly and measures how the answer streams into the
+    conversation view: time to first assistant content, update cadence, characters rendered
+    per second and main-thread long tasks while streaming. An answer counts as complete once
+    its text has not grown for quiet_ms.
+
+    Args:
+        runs (int): Prompts to send. Defaults to CHAT_BENCHMARK_RUNS or 5.
+        prompt (str): Prompt to send. Defaults to CHAT_BENCHMARK_PROMPT.
+        quiet_ms (int): How long the answer must stop growing to count as complete. Defaults to CHAT_BENCHMARK_QUIET_MS or 3000.
+        max_wait (float): Upper bound for one answer in seconds. Defaults to CHAT_BENCHMARK_MAX_WAIT or 180.
+    """
+
+    def __init__(self, runs=None, prompt=None, quiet_ms=None, max_wait=None):
+        self.runs = runs or int(os.getenv("CHAT_BENCHMARK_RUNS", "5"))
+        self.prompt = prompt or os.getenv(
+            "CHAT_BENCHMARK_PROMPT",
+            "Can you show me a basic 'hello world' Python example?",
+        )
+        self.quiet_ms = quiet_ms or int(os.getenv("CHAT_BENCHMARK_QUIET_MS", "3000"))
+        self.max_wait = max_wait or float(os.getenv("CHAT_BENCHMARK_MAX_WAIT", "180"))
 
-                if response.status_code == 200:
-                    logging.info(f"Successfully sent {demo_name} demo video to Discord")
-                else:
-                    logging.error(
-                        f"Failed to send video to Discord. Status: {response.status_code}, Response: {response.text}"
-                    )
+    async def wait_for_answer(self, page):
+        """
+        Polls the observer state until the answer stops growing and returns it
 
-        except Exception as e:
-            logging.error(f"Error sending video to Discord: {e}")
+        Args:
+            page (Page): Page the observer was installed on before sending
+        """
+        deadline = time.monotonic() + self.max_wait
+        while time.monotonic() < deadline:
+            state = await page.evaluate(CHAT_STREAM_STATE_SCRIPT)
+            if state is None:
+                raise Exception("Chat stream observer was lost, the page reloaded")
+            if (
+                state["firstContentAt"] is not None
+                and state["now"] - state["lastUpdateAt"] >= self.quiet_ms
+            ):
+                return state
+            await asyncio.sleep(0.25)
+        raise Exception(f"No complete chat answer within {self.max_wait}s")
 
-    def create_video_report(
-        self, video_name="report", max_size_mb=10, test_status="✅ Test passed"
-    ):
+    async def measure(self, page, base_uri):
         """
-        Creates a video from all screenshots taken during the test run with Google TTS narration
-        using OpenCV and FFMPEG for video processing. Adjusts framerate and compression if output exceeds size limit.
+        Starts a new conversation, sends the prompt and returns the metrics of its answer
 
         Args:
-            max_size_mb (int): Maximum size of the output video in MB. Defaults to 10.
+            page (Page): Logged in page
+            base_uri (str): Front end URI
+        """
+        await page.goto(f"{base_uri}/chat")
+        await page.click("#chat-message-input-inactive")
+        await page.fill("#chat-message-input-active", self.prompt)
+        await page.evaluate(CHAT_STREAM_OBSERVER_SCRIPT)
+        await page.press("#chat-message-input-active", "Enter")
+        return chat_stream_metrics(await self.wait_for_answer(page))
+
+    async def run(self, page, base_uri):
         """
+        Runs the prompt runs times and returns every sample with p50, p90 and p95 per metric
 
-        if is_desktop():
-            return None
-        try:
-            if not self.screenshots_with_actions:
-                logging.warning("No screenshots found to create video")
-                return None
+        Args:
+            page (Page): Logged in page
+            base_uri (str): Front end URI
+        """
+        samples = []
+        for run in range(1, self.runs + 1):
+            metrics = await self.measure(page, base_uri)
+            logging.info(
+                f"Chat run {run}/{self.runs}: first content after {metrics['ttft_ms']:.0f}ms, complete after {metrics['complete_ms']:.0f}ms, {metrics['updates']} updates"
+            )
+            samples.append(metrics)
+        summary = {}
+        for metric in samples[0]:
+            values = [
+                sample[metric] for sample in samples if sample[metric] is not None
+            ]
+            summary[metric] = {
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "p95": percentile(values, 95),
+                "max": max(values, default=None),
+            }
+        return {"prompt": self.prompt, "samples": samples, "summary": summary}
 
-            # Read first image to get dimensions
-            first_img = cv2.imread(self.screenshots_with_actions[0][0])
-            if first_img is None:
-                logging.error(
-                    f"Failed to read first screenshot: {self.screenshots_with_actions[0][0]}"
-                )
-                return None
 
-            height, width = first_img.shape[:2]
+class LoadRecorder:
+    """
+    Collects request latencies, WebSocket activity and step timings from many virtual users,
+    and summarizes them overall and per time window.
 
-            # Create temporary directory for files
-            temp_dir = tempfile.mkdtemp()
-            logging.info("Creating temporary directory for audio files...")
+    Request paths are grouped into endpoints with ids replaced by :id, and a request counts
+    as an error when it fails or answers with a 4xx or 5xx status.
 
-            def create_video(fps):
-                """Helper function to create video at specified FPS"""
-                video_path = os.path.join(temp_dir, "video_no_audio.mp4")
-                fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-                out = cv2.VideoWriter(video_path, fourcc, fps, (width, height))
-                total_frames = 0
+    Args:
+        window_seconds (float): Width of the time windows in the timeline. Defaults to LOAD_WINDOW_SECONDS or 10.
+    """
 
-                for idx, (screenshot_path, _) in enumerate(
-                    self.screenshots_with_actions
-                ):
-                    frames_needed = int(max(all_audio_lengths[idx], 2.0) * fps)
-                    img = cv2.imread(screenshot_path)
-                    for _ in range(frames_needed):
-                        out.write(img)
-                        total_frames += 1
-
-                out.release()
-                return video_path, total_frames
-
-            def combine_video_audio(silent_video_path, audio_path, output_path, crf=23):
-                """Helper function to combine video and audio with compression"""
-                subprocess.run(
-                    [
-                        "ffmpeg",
-                        "-i",
-                        silent_video_path,
-                        "-i",
-                        audio_path,
-                        "-c:v",
-                        "libx264",  # Use H.264 codec
-                        "-crf",
-                        str(
-                            crf
-                        ),  # Compression quality (18-28 is good, higher = more compression)
-                        "-preset",
-                        "medium",  # Encoding speed preset
-                        "-c:a",
-                        "aac",
-                        "-b:a",
-                        "128k",  # Compress audio bitrate
-                        output_path,
-                        "-y",
-                        "-loglevel",
-                        "error",
-                    ]
-                )
+    def __init__(self, window_seconds=None):
+        self.window_seconds = window_seconds or float(
+            os.getenv("LOAD_WINDOW_SECONDS", "10")
+        )
+        self.started = time.monotonic()
+        self.requests = []
+        self.steps = []
+        self.active_users = []
+        self.websockets = {"connections": 0, "frames_received": 0, "errors": 0}
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @staticmethod
+    def endpoint(method, url):
+        """Groups a request URL into METHOD /path with ids replaced by :id"""
+        path = re.sub(r"^[a-z]+://[^/]+", "", url).split("?")[0]
+        path = re.sub(
+            r"/([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|\d+)(?=/|$)",
+            "/:id",
+            path,
+            flags=re.IGNORECASE,
+        )
+        return f"{method} {path or '/'}"
+
+    def attach(self, page):
+        """Starts recording the requests and WebSockets of a virtual user's page"""
+
+        async def request_finished(request):
+            response = await request.response()
+            timing = request.timing
+            self.requests.append(
+                {
+                    "at": self.elapsed(),
+                    "endpoint": self.endpoint(request.method, request.url),
+                    "ms": max(timing["responseEnd"], 0),
+                    "error": response is None or response.status >= 400,
+                }
+            )
 
-            # Create paths for our files
-            # Use video_name to create properly named files in tests/ directory
-            tests_dir = os.path.join(os.getcwd(), "tests")
-            os.makedirs(tests_dir, exist_ok=True)
-            final_video_path = os.path.abspath(
-                os.path.join(tests_dir, f"{video_name}.mp4")
+        def request_failed(request):
+            self.requests.append(
+                {
+                    "at": self.elapsed(),
+                    "endpoint": self.endpoint(request.method, request.url),
+                    "ms": None,
+                    "error": True,
+                }
             )
-            concatenated_audio_path = os.path.join(temp_dir, "combined_audio.wav")
 
-            # Lists to store audio data and durations
-            all_audio_data = []
-            all_audio_lengths = []
+        def websocket_opened(websocket):
+            self.websockets["connections"] += 1
 
-            # First pass: Generate audio files and calculate durations
-            logging.info("Generating audio narrations...")
-            for idx, (_, action_name) in enumerate(
-                tqdm(
-                    self.screenshots_with_actions,
-                    desc="Generating audio files",
-                    unit="clip",
-                )
-            ):
-                # Generate audio file for this action
-                audio_path = os.path.join(temp_dir, f"audio_{idx}.wav")
+            def frame_received(payload):
+                self.websockets["frames_received"] += 1
 
-                try:
-                    # Clean up the action name for better narration
-                    cleaned_action = action_name.replace("_", " ")
-                    cleaned_action = re.sub(r"([a-z])([A-Z])", r"\1 \2", cleaned_action)
-
-                    # Generate TTS audio
-                    tts = openai.audio.speech.create(
-                        model="tts-1",
-                        voice="HAL9000",
-                        input=cleaned_action,
-                        extra_body={"language": "en"},
-                    )
-                    audio_content = base64.b64decode(tts.content)
+            def socket_error(error):
+                self.websockets["errors"] += 1
 
-                    # Write the raw audio first
-                    with open(audio_path, "wb") as audio_file:
-                        audio_file.write(audio_content)
+            websocket.on("framereceived", frame_received)
+            websocket.on("socketerror", socket_error)
 
-                    # Reopen the audio file with soundfile to ensure it's in the correct format
-                    audio_data, sample_rate = sf.read(audio_path)
+        page.on("requestfinished", request_finished)
+        page.on("requestfailed", request_failed)
+        page.on("websocket", websocket_opened)
 
-                    # Add small silence padding at the end (0.5 seconds)
-                    padding = int(0.5 * sample_rate)  # Use the actual sample rate
-                    audio_data = np.pad(audio_data, (0, padding), mode="constant")
+    def user_active(self, delta):
+        """Records a virtual user starting (1) or stopping (-1)"""
+        current = self.active_users[-1][1] if self.active_users else 0
+        self.active_users.append((self.elapsed(), current + delta))
 
-                    # Store audio data and sample rate
-                    all_audio_data.append((audio_data, sample_rate))
-                    audio_duration = len(audio_data) / sample_rate
-                    all_audio_lengths.append(max(audio_duration, 2.0))
+    def step(self, name, seconds, error=None):
+        """Records how long a virtual user step took and whether it failed"""
+        self.steps.append(
+            {
+                "at": self.elapsed(),
+                "step": name,
+                "seconds": seconds,
+                "error": str(error) if error else None,
+            }
+        )
 
-                except Exception as e:
-                    logging.error(f"Error processing clip {idx}: {e}")
-                    all_audio_lengths.append(2.0)
-            if all_audio_data:
-                # Use the sample rate from the first audio clip
-                target_sample_rate = all_audio_data[0][1]
-
-                # Resample all audio to match the first clip's sample rate if needed
-                resampled_audio = []
-                for audio_data, sr in all_audio_data:
-                    if sr != target_sample_rate:
-                        # You might need to add a resampling library like librosa here
-                        # resampled = librosa.resample(audio_data, orig_sr=sr, target_sr=target_sample_rate)
-                        resampled = audio_data  # Placeholder for actual resampling
-                    else:
-                        resampled = audio_data
-                    resampled_audio.append(resampled)
+    @staticmethod
+    def latency(samples, key):
+        values = [sample[key] for sample in samples if sample[key] is not None]
+        return {
+            "count": len(samples),
+            "errors": len([sample for sample in samples if sample["error"]]),
+            "error_rate": (
+                len([sample for sample in samples if sample["error"]]) / len(samples)
+                if samples
+                else 0
+            ),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+        }
+
+    def report(self):
+        """Returns per endpoint, per step and per time window latency and error statistics"""
+        endpoints = {}
+        for sample in self.requests:
+            endpoints.setdefault(sample["endpoint"], []).append(sample)
+        steps = {}
+        for sample in self.steps:
+            steps.setdefault(sample["step"], []).append(sample)
+
+        def in_window(samples, start):
+            return [
+                sample
+                for sample in samples
+                if start <= sample["at"] < start + self.window_seconds
+            ]
+
+        timeline = []
+        end = self.elapsed()
+        window = 0.0
+        while window < end:
+            active = [
+                users
+                for at, users in self.active_users
+                if at < window + self.window_seconds
+            ]
+            timeline.append(
+                {
+                    "at": window,
+                    "active_users": active[-1] if active else 0,
+                    "requests": self.latency(in_window(self.requests, window), "ms"),
+                    "steps": self.latency(in_window(self.steps, window), "seconds"),
+                }
+            )
+            window += self.window_seconds
+        return {
+            "requests": self.latency(self.requests, "ms"),
+            "endpoints": {
+                endpoint: self.latency(samples, "ms")
+                for endpoint, samples in sorted(endpoints.items())
+            },
+            "steps": {
+                step: self.latency(samples, "seconds")
+                for step, samples in steps.items()
+            },
+            "websockets": self.websockets,
+            "timeline": timeline,
+        }
+
+
+UUID_PATTERN = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE
+)
 
-                # Combine the resampled audio
-                combined_audio = np.concatenate(resampled_audio)
 
-                # Write with the correct sample rate
-                sf.write(concatenated_audio_path, combined_audio, target_sample_rate)
+class BackendTraffic:
+    """
+    Records the backend API traffic of a run into one HAR file per scenario, or replays
+    recorded HAR files through Playwright routing so a run never waits on the backend or
+    its models.
+
+    Requests are matched on method, path, query and JSON body with the ignore keys left
+    out and UUIDs treated as equal, so timestamps, conversation ids and TOTP codes that
+    differ between runs still match. Repeated requests are answered with their recorded
+    responses in order. Conversation WebSockets replay their recorded frames in order,
+    each received frame once the page has sent the frames recorded before it. The front
+    end server verifies the session itself, outside the browser, so replay still needs a
+    reachable backend for that check, such as tests/MockAGiXT.py.
+
+    Args:
+        mode (str): record, replay or off. Defaults to BACKEND_TRAFFIC or off.
+        har_dir (str): Directory of the HAR files. Defaults to BACKEND_HAR_DIR or tests/har.
+        origin (str): Backend whose requests are recorded and replayed. Defaults to BACKEND_ORIGIN or AGIXT_URI.
+        ignore (list): JSON keys and query parameters ignored when matching. Defaults to BACKEND_REPLAY_IGNORE.
+        fallback (str): What replay does with unmatched requests, network or abort. Defaults to BACKEND_REPLAY_FALLBACK or network.
+    """
 
-            # Initial attempt with 30 fps and moderate compression
-            initial_fps = 30
-            silent_video_path, total_frames = create_video(initial_fps)
-            combine_video_audio(
-                silent_video_path, concatenated_audio_path, final_video_path, crf=23
+    def __init__(
+        self, mode=None, har_dir=None, origin=None, ignore=None, fallback=None
+    ):
+        self.mode = (mode or os.getenv("BACKEND_TRAFFIC", "off")).lower()
+        self.har_dir = har_dir or os.getenv(
+            "BACKEND_HAR_DIR", os.path.join(TESTS_DIR, "har")
+        )
+        self.host = urlparse(
+            origin
+            or os.getenv(
+                "BACKEND_ORIGIN", os.getenv("AGIXT_URI", "https://api.agixt.dev")
             )
+        ).netloc
+        self.ignore = set(
+            ignore
+            or os.getenv(
+                "BACKEND_REPLAY_IGNORE",
+                "timestamp,token,authorization,referrer,email,user,id,conversation_id,created_at,updated_at,createdAt,updatedAt",
+            ).split(",")
+        )
+        self.fallback = (
+            fallback or os.getenv("BACKEND_REPLAY_FALLBACK", "network")
+        ).lower()
+        self.entries = {}
+        self.recorded = {}
+        self.served = {}
+        self.unmatched = 0
+        if self.mode == "replay":
+            self.load()
+
+    def normalize(self, value):
+        """Drops ignored keys from JSON data and replaces UUIDs with :id"""
+        if isinstance(value, dict):
+            return {
+                key: self.normalize(item)
+                for key, item in value.items()
+                if key not in self.ignore
+            }
+        if isinstance(value, list):
+            return [self.normalize(item) for item in value]
+        if isinstance(value, str):
+            return UUID_PATTERN.sub(":id", value)
+        return value
 
-            # Get file size in MB
-            file_size_mb = os.path.getsize(final_video_path) / (1024 * 1024)
+    def request_key(self, method, url, post_data=None):
+        """
+        Returns the key requests are matched on between recording and replay
 
-            # If file is still too large, try increasing compression and reducing fps
-            if file_size_mb > max_size_mb:
-                logging.info(
-                    f"Video size ({file_size_mb:.2f}MB) exceeds limit of {max_size_mb}MB. Adjusting settings..."
+        Args:
+            method (str): HTTP method, or WS for WebSockets
+            url (str): Request URL
+            post_data (str): Request body
+        """
+        parsed = urlparse(url)
+        query = sorted(
+            (key, UUID_PATTERN.sub(":id", value))
+            for key, value in parse_qsl(parsed.query)
+            if key not in self.ignore
+        )
+        body = ""
+        if post_data:
+            try:
+                body = json.dumps(self.normalize(json.loads(post_data)), sort_keys=True)
+            except ValueError:
+                body = UUID_PATTERN.sub(":id", post_data)
+        return (
+            f"{method} {UUID_PATTERN.sub(':id', parsed.path)}?{urlencode(query)} {body}"
+        )
+
+    def is_backend(self, url):
+        return urlparse(url).netloc == self.host
+
+    async def attach(self, context, scenario):
+        """
+        Starts recording or replaying the backend traffic of a browser context
+
+        Args:
+            context (BrowserContext): Context to record or replay
+            scenario (callable): Returns the name of the scenario running in the context
+        """
+        if self.mode == "record":
+            self.record(context, scenario)
+        elif self.mode == "replay":
+            await self.route(context, scenario)
+
+    def record(self, context, scenario):
+        async def request_finished(request):
+            if not self.is_backend(request.url):
+                return
+            response = await request.response()
+            if response is None:
+                return
+            try:
+                body = await response.body()
+            except Exception:
+                body = b""
+            try:
+                content = {"text": body.decode("utf-8")}
+            except UnicodeDecodeError:
+                content = {
+                    "text": base64.b64encode(body).decode(),
+                    "encoding": "base64",
+                }
+            content["mimeType"] = response.headers.get("content-type", "")
+            content["size"] = len(body)
+            entry = {
+                "startedDateTime": datetime.now().isoformat(),
+                "time": max(request.timing["responseEnd"], 0),
+                "request": {
+                    "method": request.method,
+                    "url": request.url,
+                    "headers": await request.headers_array(),
+                },
+                "response": {
+                    "status": response.status,
+                    "statusText": response.status_text,
+                    "headers": await response.headers_array(),
+                    "content": content,
+                },
+            }
+            if request.post_data:
+                entry["request"]["postData"] = {
+                    "mimeType": request.headers.get("content-type", ""),
+                    "text": request.post_data,
+                }
+            self.entries.setdefault(scenario(), []).append(entry)
+
+        def websocket_opened(websocket):
+            if not self.is_backend(websocket.url):
+                return
+            entry = {
+                "startedDateTime": datetime.now().isoformat(),
+                "time": 0,
+                "request": {"method": "GET", "url": websocket.url, "headers": []},
+                "response": {
+                    "status": 101,
+                    "statusText": "Switching Protocols",
+                    "headers": [],
+                    "content": {"text": "", "mimeType": "", "size": 0},
+                },
+                "_resourceType": "websocket",
+                "_webSocketMessages": [],
+            }
+            self.entries.setdefault(scenario(), []).append(entry)
+
+            def frame(message_type):
+                return lambda payload: entry["_webSocketMessages"].append(
+                    {
+                        "type": message_type,
+                        "time": time.time(),
+                        "opcode": 1,
+                        "data": payload,
+                    }
+                )
+
+            websocket.on("framesent", frame("send"))
+            websocket.on("framereceived", frame("receive"))
+
+        def page_opened(page):
+            page.on("websocket", websocket_opened)
+
+        context.on("requestfinished", request_finished)
+        context.on("page", page_opened)
+        for page in context.pages:
+            page_opened(page)
+
+    def load(self):
+        """Indexes the recorded HAR files by scenario and request key"""
+        if not os.path.isdir(self.har_dir):
+            raise Exception(f"No recorded traffic to replay in {self.har_dir}")
+        for name in sorted(os.listdir(self.har_dir)):
+            if not name.endswith(".har"):
+                continue
+            with open(os.path.join(self.har_dir, name), "r") as f:
+                entries = json.load(f)["log"]["entries"]
+            scenario = name[: -len(".har")]
+            for entry in entries:
+                request = entry["request"]
+                method = "WS" if "_webSocketMessages" in entry else request["method"]
+                key = self.request_key(
+                    method, request["url"], request.get("postData", {}).get("text")
                 )
+                self.recorded.setdefault((scenario, key), []).append(entry)
+                self.recorded.setdefault((None, key), []).append(entry)
+        logging.info(
+            f"Loaded {len([key for key in self.recorded if key[0] is None])} recorded backend requests from {self.har_dir}"
+        )
+
+    def next_entry(self, scenario, key):
+        """Returns the next recorded entry for a request, preferring the running scenario's recording"""
+        for lookup in ((scenario, key), (None, key)):
+            entries = self.recorded.get(lookup)
+            if entries:
+                served = self.served.get(lookup, 0)
+                self.served[lookup] = served + 1
+                # Once the recording runs out keep answering with its last response
+                return entries[min(served, len(entries) - 1)]
+        return None
+
+    async def route(self, context, scenario):
+        async def replay(route):
+            request = route.request
+            key = self.request_key(request.method, request.url, request.post_data)
+            entry = self.next_entry(scenario(), key)
+            if entry is None:
+                self.unmatched += 1
+                logging.info(f"No recorded backend response for {key}")
+                if self.fallback == "abort":
+                    await route.abort()
+                else:
+                    await route.continue_()
+                return
+            content = entry["response"]["content"]
+            body = (
+                base64.b64decode(content["text"])
+                if content.get("encoding") == "base64"
+                else content.get("text", "").encode("utf-8")
+            )
+            await route.fulfill(
+                status=entry["response"]["status"],
+                headers={
+                    header["name"]: header["value"]
+                    for header in entry["response"]["headers"]
+                    if header["name"].lower()
+                    not in ("content-length", "content-encoding", "transfer-encoding")
+                },
+                body=body,
+            )
+
+        def replay_websocket(websocket):
+            entry = self.next_entry(scenario(), self.request_key("WS", websocket.url))
+            if entry is None:
+                self.unmatched += 1
+                if self.fallback != "abort":
+                    websocket.connect_to_server()
+                return
+            messages = entry["_webSocketMessages"]
+            position = 0
+
+            def send_received_frames():
+                # Sends the recorded backend frames up to the next frame the page sent
+                nonlocal position
+                while (
+                    position < len(messages) and messages[position]["type"] == "receive"
+                ):
+                    websocket.send(messages[position]["data"])
+                    position += 1
+
+            def message_sent(message):
+                nonlocal position
+                if position < len(messages):
+                    position += 1
+                send_received_frames()
+
+            websocket.on_message(message_sent)
+            send_received_frames()
+
+        await context.route(lambda url: self.is_backend(url), replay)
+        if hasattr(context, "route_web_socket"):
+            await context.route_web_socket(
+                lambda url: self.is_backend(url), replay_websocket
+            )
 
-                # First try stronger compression
-                logging.info("Attempting stronger compression...")
-                combine_video_audio(
-                    silent_video_path, concatenated_audio_path, final_video_path, crf=28
+    def save(self):
+        """Writes the recorded traffic as one HAR file per scenario"""
+        if self.mode != "record":
+            return
+        os.makedirs(self.har_dir, exist_ok=True)
+        for scenario, entries in self.entries.items():
+            har_path = os.path.join(self.har_dir, f"{scenario}.har")
+            with open(har_path, "w") as f:
+                json.dump(
+                    {
+                        "log": {
+                            "version": "1.2",
+                            "creator": {"name": "FrontEndTest", "version": "1.0"},
+                            "entries": entries,
+                        }
+                    },
+                    f,
+                    indent=2,
+                )
+            logging.info(f"Recorded {len(entries)} backend requests to {har_path}")
+
+
+class DiscordUploader:
+    """
+    Sends report videos to a Discord webhook from a background thread, so a slow or failing
+    webhook never holds up the browser scenarios.
+
+    Uploads share one HTTP session and the git metadata of the run, which is looked up once.
+    Failed uploads are retried with exponential backoff, honouring Discord's retry_after on
+    rate limits. Call flush() before exiting so queued uploads are not lost.
+
+    Args:
+        webhook (str): Discord webhook URL. Defaults to DISCORD_WEBHOOK.
+        retries (int): Attempts per upload. Defaults to DISCORD_UPLOAD_RETRIES or 3.
+        timeout (float): Seconds before an upload attempt is abandoned. Defaults to DISCORD_UPLOAD_TIMEOUT or 60.
+        backoff (float): Seconds before the first retry, doubled on every further retry
+    """
+
+    # Format actor with proper Discord mentions if known
+    DISCORD_MENTIONS = {
+        "Josh-XT": "<@381837595522367488>",
+        "waiscodes": "<@670762167037067304>",
+        "birdup000": "<@856308374567256074>",
+        "Nick-XT": "<@381908912951001088>",
+    }
+
+    def __init__(self, webhook=None, retries=None, timeout=None, backoff=2.0):
+        self.webhook = webhook or os.getenv("DISCORD_WEBHOOK")
+        self.retries = retries or int(os.getenv("DISCORD_UPLOAD_RETRIES", "3"))
+        self.timeout = timeout or float(os.getenv("DISCORD_UPLOAD_TIMEOUT", "60"))
+        self.backoff = backoff
+        self.session = requests.Session()
+        self.metadata = None
+        self.uploads = queue.Queue()
+        self.worker = None
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+
+    def git_output(self, args, fallback):
+        try:
+            return (
+                subprocess.check_output(
+                    ["git"] + args, cwd=os.getcwd(), stderr=subprocess.DEVNULL
                 )
-                file_size_mb = os.path.getsize(final_video_path) / (1024 * 1024)
+                .decode()
+                .strip()
+            )
+        except Exception:
+            return fallback
+
+    def run_metadata(self):
+        """Returns the repository, branch, commit and actor of the run, looked up on first use"""
+        if self.metadata is None:
+            self.metadata = {
+                "repo_name": os.getenv("GITHUB_REPOSITORY", "Interactive"),
+                "branch_name": self.git_output(
+                    ["rev-parse", "--abbrev-ref", "HEAD"],
+                    os.getenv("GITHUB_REF_NAME", "unknown"),
+                ),
+                "commit_hash": self.git_output(
+                    ["rev-parse", "--short", "HEAD"],
+                    os.getenv("GITHUB_SHA", "unknown")[:7],
+                ),
+                "commit_message": self.git_output(
+                    ["log", "-1", "--pretty=%B"],
+                    os.getenv("GITHUB_EVENT_HEAD_COMMIT_MESSAGE", "No commit message"),
+                ),
+                "actor": os.getenv("GITHUB_ACTOR", "local-user"),
+            }
+        return self.metadata
+
+    def message(self, demo_name, test_status):
+        metadata = self.run_metadata()
+        actor = metadata["actor"]
+        # check if failure, if it is, tag them, otherwise just use their name
+        if test_status != "✅ Test passed":
+            discord_name = self.DISCORD_MENTIONS.get(actor, f"**{actor}**")
+        else:
+            discord_name = f"**{actor}**"
+        return f"{test_status}: **{demo_name}** on repository **{metadata['repo_name']}** branch **{metadata['branch_name']}** commit '{metadata['commit_message']}' ({metadata['commit_hash']}) by {discord_name}"
+
+    def submit(self, video_path, demo_name, test_status="✅ Test passed", on_done=None):
+        """
+        Queues a video for upload and returns right away
+
+        Args:
+            video_path (str): Path to the video file
+            demo_name (str): Name of the demo/test for the message
+            test_status (str): Status prefix for the message
+            on_done (callable): Called with (sent, seconds) once the upload finished or gave up
+        """
+        if not self.webhook:
+            logging.warning(
+                "DISCORD_WEBHOOK environment variable not set, skipping Discord upload"
+            )
+            return
+        with self.lock:
+            if self.worker is None:
+                self.worker = threading.Thread(target=self.work, daemon=True)
+                self.worker.start()
+        self.uploads.put((video_path, demo_name, test_status, on_done))
+
+    def work(self):
+        while True:
+            video_path, demo_name, test_status, on_done = self.uploads.get()
+            start = time.perf_counter()
+            try:
+                sent = self.send(video_path, demo_name, test_status)
+            except Exception as e:
+                logging.error(f"Error sending video to Discord: {e}")
+                sent = False
+            if sent:
+                self.sent += 1
+            else:
+                self.failed += 1
+            if on_done:
+                on_done(sent, time.perf_counter() - start)
+            self.uploads.task_done()
+
+    def send(self, video_path, demo_name, test_status):
+        """Uploads one video with retries, returns True once Discord accepted it"""
+        data = {"content": self.message(demo_name, test_status)}
+        for attempt in range(1, self.retries + 1):
+            delay = self.backoff * 2 ** (attempt - 1)
+            try:
+                with open(video_path, "rb") as video_file:
+                    response = self.session.post(
+                        self.webhook,
+                        files={"file": video_file},
+                        data=data,
+                        timeout=self.timeout,
+                    )
+            except requests.RequestException as e:
+                logging.warning(
+                    f"Discord upload of {demo_name} failed on attempt {attempt}/{self.retries}: {e}"
+                )
+            else:
+                if response.status_code in (200, 204):
+                    logging.info(f"Successfully sent {demo_name} demo video to Discord")
+                    return True
+                if response.status_code == 429:
+                    try:
+                        delay = float(response.json().get("retry_after", delay))
+                    except ValueError:
+                        delay = float(response.headers.get("Retry-After", delay))
+                elif response.status_code < 500:
+                    # Client errors such as a too large file won't succeed on a retry
+                    logging.error(
+                        f"Failed to send video to Discord. Status: {response.status_code}, Response: {response.text}"
+                    )
+                    return False
+                logging.warning(
+                    f"Discord upload of {demo_name} got status {response.status_code} on attempt {attempt}/{self.retries}"
+                )
+            if attempt < self.retries:
+                time.sleep(delay)
+        logging.error(
+            f"Failed to send {demo_name} video to Discord after {self.retries} attempts"
+        )
+        return False
+
+    def flush(self):
+        """Waits until every queued upload was sent or gave up"""
+        if self.worker is None or not self.uploads.unfinished_tasks:
+            return
+        logging.info(
+            f"Waiting for {self.uploads.unfinished_tasks} queued Discord uploads..."
+        )
+        self.uploads.join()
+        logging.info(f"Discord uploads: {self.sent} sent, {self.failed} failed")
+
+
+VERIFICATION_PROMPT = """The goal will be to view the screenshot and determine if the action was successful or not.
+
+        The action we were trying to perform was: {action_name}
+
+        This screenshot shows the result of the action.
+
+        In your <answer> block, respond with only one word `True` if the screenshot is as expected, to indicate if the action was successful. If the action was not successful, explain why in the <answer> block, this will be sent to the developers as the error in the test.
+        """
+
+
+class ScreenshotVerifier:
+    """
+    Asks an agent whether screenshots show their action succeeding, off the critical path.
+
+    Screenshots are downscaled and sent as base64 JPEG data URLs from a bounded thread pool,
+    so scenarios keep running while verdicts come in. Verdicts are cached by action and
+    perceptual hash, so an unchanged screen is never judged twice. Passing verdicts are
+    also kept on disk for later runs.
+
+    Args:
+        agixt (AGiXTSDK): SDK client used to prompt the agent
+        concurrency (int): Verifications in flight at once. Defaults to VERIFY_CONCURRENCY or 4.
+        max_width (int): Width screenshots are downscaled to before sending. Defaults to VERIFY_MAX_WIDTH or 768.
+        agent_name (str): Agent judging the screenshots. Defaults to VERIFY_AGENT or XT.
+        cache_path (str): JSON file of passing verdicts from earlier runs. Defaults to VERIFY_CACHE_PATH.
+    """
+
+    def __init__(
+        self, agixt, concurrency=None, max_width=None, agent_name=None, cache_path=None
+    ):
+        self.agixt = agixt
+        self.max_width = max_width or int(os.getenv("VERIFY_MAX_WIDTH", "768"))
+        self.agent_name = agent_name or os.getenv("VERIFY_AGENT", "XT")
+        self.cache_path = cache_path or os.getenv(
+            "VERIFY_CACHE_PATH",
+            os.path.join(tempfile.gettempdir(), "agixt-interactive-verdicts.json"),
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=concurrency or int(os.getenv("VERIFY_CONCURRENCY", "4"))
+        )
+        self.lock = threading.Lock()
+        self.verdicts = {}
+        self.in_flight = {}
+        self.hits = 0
+        self.misses = 0
+        if os.path.exists(self.cache_path):
+            with open(self.cache_path, "r") as f:
+                self.verdicts = {key: None for key in json.load(f)}
+
+    def encode(self, image):
+        """Returns a downscaled image as a base64 JPEG data URL"""
+        height, width = image.shape[:2]
+        if width > self.max_width:
+            image = cv2.resize(
+                image,
+                (self.max_width, round(height * self.max_width / width)),
+                interpolation=cv2.INTER_AREA,
+            )
+        encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 85])[1]
+        return f"data:image/jpeg;base64,{base64.b64encode(encoded.tobytes()).decode()}"
+
+    def submit(self, action_name, image_bytes):
+        """
+        Queues a screenshot for verification
+
+        Args:
+            action_name (str): Action the screenshot is the result of
+            image_bytes (bytes): Encoded screenshot
+
+        Returns:
+            Future: Resolves to None if the action looks successful, otherwise the failure message
+        """
+        image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+        key = f"{action_name}:{np.packbits(perceptual_hash(image)).tobytes().hex()}"
+        with self.lock:
+            if key in self.verdicts:
+                self.hits += 1
+                future = Future()
+                future.set_result(self.verdicts[key])
+                return future
+            if key in self.in_flight:
+                self.hits += 1
+                return self.in_flight[key]
+            self.misses += 1
+            future = self.executor.submit(self.verify, key, action_name, image)
+            self.in_flight[key] = future
+            return future
+
+    def verify(self, key, action_name, image):
+        try:
+            response = self.agixt.prompt_agent(
+                agent_name=self.agent_name,
+                prompt_name="Think About It",
+                prompt_args={
+                    "user_input": VERIFICATION_PROMPT.format(action_name=action_name),
+                    "file_urls": [self.encode(image)],
+                },
+            )
+        except Exception as e:
+            with self.lock:
+                self.in_flight.pop(key, None)
+            return f"Could not verify {action_name}: {e}"
+        logging.info(f"Agent response: {response}")
+        verdict = None
+        if re.sub(r"[^a-zA-Z]", "", response).lower() != "true":
+            verdict = f"Action failed: {action_name}\nAI suggested the action was not successful:\n{response}"
+        with self.lock:
+            self.in_flight.pop(key, None)
+            self.verdicts[key] = verdict
+        return verdict
+
+    def save(self):
+        """Keeps the passing verdicts for later runs"""
+        with self.lock:
+            passed = sorted(
+                key for key, verdict in self.verdicts.items() if verdict is None
+            )
+        with open(self.cache_path, "w") as f:
+            json.dump(passed, f)
+        logging.info(
+            f"Screenshot verification cache: {self.hits} hits, {self.misses} misses"
+        )
+
+
+# Finds on-screen text that changes between runs, such as times, dates, generated emails and ids
+VOLATILE_RECTS_SCRIPT = """(selectors) => {
+    const patterns = [
+        /[\\w.+-]+@[\\w-]+\\.[\\w.]+/,
+        /[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}/i,
+        /\\b\\d{1,2}:\\d{2}(:\\d{2})?\\b/,
+        /\\b\\d{4}-\\d{2}-\\d{2}\\b|\\b\\d{1,2}\\/\\d{1,2}\\/\\d{2,4}\\b/,
+        /\\bago\\b|\\bjust now\\b/i,
+    ];
+    const volatile = (text) => patterns.some((pattern) => pattern.test(text));
+    const rects = [];
+    const add = (rect) => {
+        if (rect.width > 0 && rect.height > 0) {
+            rects.push({ x: rect.x, y: rect.y, width: rect.width, height: rect.height });
+        }
+    };
+    const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+    while (walker.nextNode()) {
+        if (!volatile(walker.currentNode.textContent)) continue;
+        const range = document.createRange();
+        range.selectNodeContents(walker.currentNode);
+        for (const rect of range.getClientRects()) add(rect);
+    }
+    for (const input of document.querySelectorAll("input, textarea")) {
+        if (volatile(input.value)) add(input.getBoundingClientRect());
+    }
+    for (const selector of selectors) {
+        for (const element of document.querySelectorAll(selector)) {
+            add(element.getBoundingClientRect());
+        }
+    }
+    return rects;
+}"""
+
+
+def structural_similarity(first, second):
+    """
+    Returns the mean SSIM of two grayscale images of the same size, 1.0 for identical images
+
+    Args:
+        first (ndarray): Grayscale image
+        second (ndarray): Grayscale image
+    """
+    first = first.astype(np.float32)
+    second = second.astype(np.float32)
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+
+    def blur(image):
+        return cv2.GaussianBlur(image, (11, 11), 1.5)
+
+    mu_first, mu_second = blur(first), blur(second)
+    variance_first = blur(first * first) - mu_first**2
+    variance_second = blur(second * second) - mu_second**2
+    covariance = blur(first * second) - mu_first * mu_second
+    ssim_map = ((2 * mu_first * mu_second + c1) * (2 * covariance + c2)) / (
+        (mu_first**2 + mu_second**2 + c1) * (variance_first + variance_second + c2)
+    )
+    return float(ssim_map.mean())
+
+
+def changed_boxes(first, second, threshold=25, min_area=16):
+    """
+    Returns (x, y, width, height) boxes around the areas that differ between two grayscale images
+
+    Args:
+        first (ndarray): Grayscale image
+        second (ndarray): Grayscale image of the same size
+        threshold (int): Smallest pixel difference counted as a change
+        min_area (int): Smallest changed area in pixels that gets a box
+    """
+    changed = (cv2.absdiff(first, second) > threshold).astype(np.uint8) * 255
+    # Merge nearby changed pixels, such as the letters of a word, into one box
+    changed = cv2.dilate(changed, np.ones((9, 9), np.uint8))
+    contours, _ = cv2.findContours(changed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return [
+        cv2.boundingRect(contour)
+        for contour in contours
+        if cv2.contourArea(contour) >= min_area
+    ]
+
+
+class VisualBaseline:
+    """
+    Compares step screenshots with the screenshots of the last green run, locally and in milliseconds.
+
+    Each step is compared on SSIM and the share of changed pixels, with volatile areas such
+    as timestamps and generated emails masked out of both images. Matching steps pass
+    without any model call. Screenshots are staged and the images of changed and new steps
+    are written to the report directory as soon as they are compared, so nothing is kept in
+    memory. Staged screenshots of a scenario become its baseline once the scenario passes.
+
+    Args:
+        report_dir (str): Directory for the HTML diff report and the staged screenshots of this run.
+        baseline_dir (str): Directory of the baselines. Defaults to VISUAL_BASELINE_DIR or ~/.cache/agixt-interactive/visual-baselines.
+        ssim_threshold (float): Lowest SSIM of a matching step. Defaults to VISUAL_SSIM_THRESHOLD or 0.99.
+        max_changed_pct (float): Highest percentage of changed pixels of a matching step. Defaults to VISUAL_MAX_CHANGED_PCT or 0.1.
+        mask_selectors (list): CSS selectors always masked. Defaults to VISUAL_MASK_SELECTORS.
+    """
+
+    def __init__(
+        self,
+        report_dir,
+        baseline_dir=None,
+        ssim_threshold=None,
+        max_changed_pct=None,
+        mask_selectors=None,
+    ):
+        self.report_dir = report_dir
+        self.baseline_dir = baseline_dir or os.getenv(
+            "VISUAL_BASELINE_DIR",
+            os.path.join(
+                os.path.expanduser("~"),
+                ".cache",
+                "agixt-interactive",
+                "visual-baselines",
+            ),
+        )
+        self.ssim_threshold = ssim_threshold or float(
+            os.getenv("VISUAL_SSIM_THRESHOLD", "0.99")
+        )
+        self.max_changed_pct = (
+            max_changed_pct
+            if max_changed_pct is not None
+            else float(os.getenv("VISUAL_MAX_CHANGED_PCT", "0.1"))
+        )
+        self.mask_selectors = mask_selectors or [
+            selector
+            for selector in os.getenv("VISUAL_MASK_SELECTORS", "").split(",")
+            if selector
+        ]
+        self.lock = threading.Lock()
+        self.step_counts = {}
+        self.candidates = {}
+        self.compared = 0
+        self.flagged = []
+
+    async def volatile_rects(self, target):
+        """Returns the rects of volatile text on the page, nothing is masked if the page is mid-navigation"""
+        try:
+            return await target.evaluate(VOLATILE_RECTS_SCRIPT, self.mask_selectors)
+        except Exception as e:
+            logging.info(f"Could not find volatile areas to mask: {e}")
+            return []
+
+    def baseline_path(self, scenario, step, extension):
+        with self.lock:
+            occurrence = self.step_counts.get((scenario, step), 0) + 1
+            self.step_counts[(scenario, step)] = occurrence
+        name = re.sub(r"[^a-zA-Z0-9_-]", "_", step)[:80]
+        digest = hashlib.sha1(step.encode("utf-8")).hexdigest()[:8]
+        return os.path.join(
+            self.baseline_dir, scenario, f"{name}_{digest}_{occurrence}.{extension}"
+        )
+
+    def stage(self, scenario, baseline_path, image_bytes):
+        """Writes a screenshot next to the report until its scenario passes"""
+        staged_path = os.path.join(
+            self.report_dir,
+            "candidates",
+            os.path.relpath(baseline_path, self.baseline_dir),
+        )
+        os.makedirs(os.path.dirname(staged_path), exist_ok=True)
+        with open(staged_path, "wb") as f:
+            f.write(image_bytes)
+        with self.lock:
+            self.candidates.setdefault(scenario, []).append(
+                (baseline_path, staged_path)
+            )
+
+    def compare(self, scenario, step, image_bytes, masks=None):
+        """
+        Compares a step screenshot with its baseline and stages it as the next baseline.
+        Blocking, so call it from a worker thread.
+
+        Args:
+            scenario (str): Scenario name
+            step (str): Action name of the screenshot
+            image_bytes (bytes): Encoded screenshot
+            masks (list): {"x", "y", "width", "height"} areas ignored by the comparison
+
+        Returns:
+            dict: The step's status ("match", "changed" or "new"), SSIM, changed percentage and changed boxes
+        """
+        baseline_path = self.baseline_path(scenario, step, image_format(image_bytes))
+        self.stage(scenario, baseline_path, image_bytes)
+        image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+        result = {
+            "scenario": scenario,
+            "step": step,
+            "status": "new",
+            "masks": masks or [],
+            "boxes": [],
+        }
+        baseline = cv2.imread(baseline_path)
+        if baseline is not None and baseline.shape == image.shape:
+            current_gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            baseline_gray = cv2.cvtColor(baseline, cv2.COLOR_BGR2GRAY)
+            for mask in result["masks"]:
+                x, y = max(int(mask["x"]) - 2, 0), max(int(mask["y"]) - 2, 0)
+                right = int(mask["x"] + mask["width"]) + 2
+                bottom = int(mask["y"] + mask["height"]) + 2
+                current_gray[y:bottom, x:right] = 0
+                baseline_gray[y:bottom, x:right] = 0
+            # Half resolution is enough for SSIM to catch layout and styling changes
+            ssim = structural_similarity(
+                cv2.resize(
+                    baseline_gray, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA
+                ),
+                cv2.resize(
+                    current_gray, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA
+                ),
+            )
+            changed_pct = (
+                100.0
+                * np.count_nonzero(cv2.absdiff(baseline_gray, current_gray) > 25)
+                / current_gray.size
+            )
+            matched = (
+                ssim >= self.ssim_threshold and changed_pct <= self.max_changed_pct
+            )
+            result.update(
+                {
+                    "status": "match" if matched else "changed",
+                    "ssim": ssim,
+                    "changed_pct": changed_pct,
+                    "boxes": (
+                        [] if matched else changed_boxes(baseline_gray, current_gray)
+                    ),
+                }
+            )
+        elif baseline is not None:
+            result["status"] = "changed"
+        with self.lock:
+            self.compared += 1
+            if result["status"] != "match":
+                result["index"] = len(self.flagged)
+                self.flagged.append(result)
+        if result["status"] != "match":
+            self.write_images(result, image, baseline)
+        return result
+
+    def write_images(self, result, image, baseline):
+        """Writes the current, baseline and diff images of a flagged step to the report directory"""
+        os.makedirs(self.report_dir, exist_ok=True)
+        idx = result["index"]
+        cv2.imwrite(os.path.join(self.report_dir, f"{idx}_current.png"), image)
+        if result["status"] != "changed":
+            return
+        cv2.imwrite(os.path.join(self.report_dir, f"{idx}_baseline.png"), baseline)
+        diff = image.copy()
+        for mask in result["masks"]:
+            cv2.rectangle(
+                diff,
+                (int(mask["x"]), int(mask["y"])),
+                (
+                    int(mask["x"] + mask["width"]),
+                    int(mask["y"] + mask["height"]),
+                ),
+                (128, 128, 128),
+                -1,
+            )
+        for x, y, width, height in result["boxes"]:
+            cv2.rectangle(diff, (x, y), (x + width, y + height), (0, 0, 255), 2)
+        cv2.imwrite(os.path.join(self.report_dir, f"{idx}_diff.png"), diff)
+
+    def promote(self, scenario):
+        """Makes a passed scenario's screenshots the baseline of the next run"""
+        with self.lock:
+            candidates = self.candidates.pop(scenario, [])
+        for baseline_path, staged_path in candidates:
+            os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+            shutil.move(staged_path, baseline_path)
+        if candidates:
+            logging.info(
+                f"Promoted {len(candidates)} screenshots of {scenario} to visual baselines"
+            )
+
+    def write_report(self):
+        """
+        Writes an HTML report of the changed and new steps with their baseline, screenshot and changed areas
+
+        Returns:
+            str: Path of the report, or None if every step matched
+        """
+        with self.lock:
+            flagged = list(self.flagged)
+            compared = self.compared
+        if not flagged:
+            return None
+        rows = []
+        for result in flagged:
+            idx = result["index"]
+            if result["status"] == "changed":
+                cells = [
+                    f'<img src="{idx}_baseline.png">',
+                    f'<img src="{idx}_current.png">',
+                    f'<img src="{idx}_diff.png">',
+                ]
+                details = f"SSIM {result.get('ssim', 0):.4f}, {result.get('changed_pct', 0):.2f}% changed, {len(result['boxes'])} areas"
+            else:
+                cells = ["", f'<img src="{idx}_current.png">', ""]
+                details = "No baseline yet"
+            rows.append(
+                f"<tr><td><b>{html.escape(result['scenario'])}</b><br>{html.escape(result['step'])}<br>"
+                f"<i>{result['status']}: {details}</i></td><td>"
+                + "</td><td>".join(cells)
+                + "</td></tr>"
+            )
+        report_path = os.path.join(self.report_dir, "index.html")
+        with open(report_path, "w") as f:
+            f.write(
+                "<html><head><title>Visual regression report</title><style>"
+                "td{vertical-align:top;padding:4px}img{width:420px;border:1px solid #ccc}"
+                "</style></head><body>"
+                f"<h1>{len(flagged)} of {compared} steps differ from their baseline</h1>"
+                "<table><tr><th>Step</th><th>Baseline</th><th>Current</th><th>Changes</th></tr>"
+                + "".join(rows)
+                + "</table></body></html>"
+            )
+        return report_path
+
+
+class NarrationCache:
+    """
+    On-disk cache of synthesized narration keyed by (text, model, voice, language).
+
+    Entries hold the decoded PCM samples and their sample rate, so a hit skips both the
+    TTS request and the audio decode. The cache directory is bounded by size and the
+    least recently used entries are evicted first.
+
+    Args:
+        cache_dir (str): Directory for cache entries. Defaults to NARRATION_CACHE_DIR or ~/.cache/agixt-interactive/narration.
+        max_size_mb (float): Maximum size of the cache directory in MB. Defaults to NARRATION_CACHE_MAX_MB or 200.
+    """
+
+    def __init__(self, cache_dir=None, max_size_mb=None):
+        self.cache_dir = cache_dir or os.getenv(
+            "NARRATION_CACHE_DIR",
+            os.path.join(
+                os.path.expanduser("~"), ".cache", "agixt-interactive", "narration"
+            ),
+        )
+        if max_size_mb is None:
+            max_size_mb = float(os.getenv("NARRATION_CACHE_MAX_MB", "200"))
+        self.max_size_mb = max_size_mb
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def entry_path(self, text, model, voice, language):
+        key = hashlib.sha256(
+            json.dumps([text, model, voice, language]).encode("utf-8")
+        ).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def get(self, text, model, voice, language):
+        """Returns (audio_data, sample_rate) for a cached narration, or None on a miss"""
+        path = self.entry_path(text, model, voice, language)
+        try:
+            with np.load(path) as entry:
+                audio_data = entry["audio"]
+                sample_rate = int(entry["sample_rate"])
+            # Touch the entry so eviction treats it as recently used
+            os.utime(path, None)
+        except (OSError, KeyError, ValueError):
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return audio_data, sample_rate
+
+    def put(self, text, model, voice, language, audio_data, sample_rate):
+        path = self.entry_path(text, model, voice, language)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, "wb") as entry_file:
+                np.savez(
+                    entry_file,
+                    audio=np.asarray(audio_data, dtype=np.float32),
+                    sample_rate=np.int64(sample_rate),
+                )
+            os.replace(temp_path, path)
+        except OSError as e:
+            logging.warning(f"Failed to write narration cache entry: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits in max_size_mb"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npz"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total_size = sum(size for _, size, _ in entries)
+        max_size = self.max_size_mb * 1024 * 1024
+        for _, size, path in sorted(entries):
+            if total_size <= max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+
+class VideoReportRenderer:
+    """
+    Renders narrated report videos from lists of screenshots and their action descriptions.
+
+    The renderer only holds plain settings and the narration cache, so it can be handed to
+    report worker processes as well as used inline.
+
+    Args:
+        narration_cache (NarrationCache): Cache of synthesized narration
+        narration_concurrency (int): Number of narration clips synthesized in parallel. Defaults to NARRATION_CONCURRENCY or 4.
+        size_mode (str): "capped" for constant quality capped at the bitrate budget, or "two-pass". Defaults to REPORT_SIZE_MODE or capped.
+        narration (str): "tts" for narrated videos, "captions" for silent videos with burned in captions, or "auto" to caption when EZLOCALAI_URI is not set. Defaults to REPORT_NARRATION or auto.
+        dedup_distance (int): Most differing perceptual hash bits (of 1024) for consecutive screenshots to be merged into one frame, negative disables merging. Defaults to REPORT_DEDUP_DISTANCE or 6.
+        width (int): Width the video is scaled down to, 0 keeps the screenshot width. Defaults to REPORT_WIDTH or 0.
+        crop (str): "off", "focus" to zoom into the element a screenshot was focused on, or "changed" to also zoom into the area that changed since the previous frame when a screenshot has no focus element. Defaults to REPORT_CROP or off.
+    """
+
+    def __init__(
+        self,
+        narration_cache=None,
+        narration_concurrency=None,
+        size_mode=None,
+        narration=None,
+        dedup_distance=None,
+        width=None,
+        crop=None,
+    ):
+        self.narration_cache = narration_cache or NarrationCache()
+        # Number of narration clips synthesized in parallel
+        self.narration_concurrency = narration_concurrency or int(
+            os.getenv("NARRATION_CONCURRENCY", "4")
+        )
+        self.size_mode = size_mode or os.getenv("REPORT_SIZE_MODE", "capped")
+        self.narration = (narration or os.getenv("REPORT_NARRATION", "auto")).lower()
+        if self.narration == "auto":
+            self.narration = "tts" if os.getenv("EZLOCALAI_URI") else "captions"
+        self.dedup_distance = (
+            dedup_distance
+            if dedup_distance is not None
+            else int(os.getenv("REPORT_DEDUP_DISTANCE", "6"))
+        )
+        self.width = width if width is not None else int(os.getenv("REPORT_WIDTH", "0"))
+        self.crop = (crop or os.getenv("REPORT_CROP", "off")).lower()
+
+    def synthesize_narration(self, text, model="tts-1", voice="HAL9000", language="en"):
+        """
+        Returns decoded narration audio and its sample rate for the given text,
+        checking the narration cache before calling the TTS endpoint.
+
+        Args:
+            text (str): Text to narrate
+            model (str): TTS model name
+            voice (str): TTS voice name
+            language (str): Narration language
+        """
+        cached = self.narration_cache.get(text, model, voice, language)
+        if cached is not None:
+            return cached
+        tts = openai.audio.speech.create(
+            model=model,
+            voice=voice,
+            input=text,
+            extra_body={"language": language},
+        )
+        audio_data, sample_rate = sf.read(
+            io.BytesIO(base64.b64decode(tts.content)), dtype="float32"
+        )
+        self.narration_cache.put(text, model, voice, language, audio_data, sample_rate)
+        return audio_data, sample_rate
+
+    def narrate_action(self, action_name):
+        """Returns (audio_data, sample_rate) narrating an action, or None if synthesis failed"""
+        try:
+            # Clean up the action name for better narration
+            return self.synthesize_narration(clean_action_name(action_name))
+        except Exception as e:
+            logging.error(f"Error processing clip '{action_name}': {e}")
+            return None
+
+    def generate_narrations(self, action_names):
+        """
+        Synthesizes narration for each action using a bounded thread pool.
+
+        Args:
+            action_names (list): Action descriptions to narrate, in screenshot order
+
+        Returns:
+            list: (audio_data, sample_rate) per action in the same order, or None for clips that failed
+        """
+
+        narrations = [None] * len(action_names)
+        with ThreadPoolExecutor(
+            max_workers=max(1, self.narration_concurrency)
+        ) as executor:
+            futures = {
+                executor.submit(self.narrate_action, action_name): idx
+                for idx, action_name in enumerate(action_names)
+            }
+            for future in tqdm(
+                as_completed(futures),
+                total=len(futures),
+                desc="Generating audio files",
+                unit="clip",
+            ):
+                narrations[futures[future]] = future.result()
+        return narrations
+
+    def crop_frames(self, frame_paths, groups, regions, size, directory):
+        """
+        Crops the frame shown for each group to its focus element or changed area, in place in frame_paths.
+
+        Args:
+            frame_paths (list): Screenshot paths in display order
+            groups (list): Runs of similar frame indexes from group_similar_frames
+            regions (list): Focus region per screenshot, or None
+            size (tuple): (width, height) of the output canvas
+            directory (str): Directory for the cropped frames
+        """
+        previous = None
+        for group in groups:
+            idx = group[-1]
+            image = cv2.imread(frame_paths[idx])
+            if image is None:
+                continue
+            focus = [regions[member] for member in group if regions[member]]
+            if focus:
+                region = focus[-1]
+            elif self.crop == "changed":
+                region = changed_region(previous, image)
+            else:
+                region = None
+            previous = image
+            if region is None:
+                continue
+            x, y, width, height = fit_region(
+                region, (image.shape[1], image.shape[0]), size[0] / size[1]
+            )
+            # Keep the source format, the concat demuxer needs one codec for every frame
+            extension = os.path.splitext(frame_paths[idx])[1]
+            frame_paths[idx] = os.path.join(directory, f"crop_{idx}{extension}")
+            cv2.imwrite(frame_paths[idx], image[y : y + height, x : x + width])
+
+    def render(
+        self, screenshots_with_actions, output_path, max_size_mb=10, regions=None
+    ):
+        """
+        Renders a narrated video from screenshots. Each screenshot is shown once for the length
+        of its narration and encoded with FFMPEG, with the bitrate budgeted from the total
+        duration so the output fits the size limit on the first pass. Runs of near identical
+        screenshots are shown as their last frame for the length of all their narration.
+
+        Args:
+            screenshots_with_actions (list): (frame, action_name) pairs in display order, where frame is a file path or encoded image bytes
+            output_path (str): Destination MP4 path
+            max_size_mb (int): Maximum size of the output video in MB. Defaults to 10.
+            regions (list): Optional {"x", "y", "width", "height"} focus region per screenshot, or None
+
+        Returns:
+            dict: Duration, bitrate budget, number of FFMPEG passes, size of the video and seconds per render stage, or None if it could not be rendered
+        """
+        stages = {}
+        # Create temporary directory for files
+        temp_dir = tempfile.mkdtemp()
+        logging.info("Creating temporary directory for audio files...")
+        start = time.perf_counter()
+        frame_paths = materialize_frames(
+            [frame for frame, _ in screenshots_with_actions], temp_dir
+        )
+        stages["frame_write"] = time.perf_counter() - start
+
+        # Read first image to get dimensions
+        first_img = cv2.imread(frame_paths[0])
+        if first_img is None:
+            logging.error(f"Failed to read first screenshot: {frame_paths[0]}")
+            shutil.rmtree(temp_dir)
+            return None
+
+        height, width = first_img.shape[:2]
+        if 0 < self.width < width:
+            width, height = self.width, round(height * self.width / width)
+
+        concatenated_audio_path = os.path.join(temp_dir, "combined_audio.wav")
+
+        start = time.perf_counter()
+        groups = group_similar_frames(frame_paths, self.dedup_distance)
+        stages["dedup"] = time.perf_counter() - start
+        if len(groups) < len(frame_paths):
+            logging.info(
+                f"Merged {len(frame_paths)} screenshots into {len(groups)} distinct frames"
+            )
+        if self.crop != "off":
+            # Zoomed frames are letterboxed back into the fixed canvas by the encoder
+            start = time.perf_counter()
+            self.crop_frames(
+                frame_paths,
+                groups,
+                regions or [None] * len(frame_paths),
+                (width, height),
+                temp_dir,
+            )
+            stages["crop"] = time.perf_counter() - start
+
+        if self.narration == "captions":
+            # Silent video, each frame captioned and shown for the caption's reading time
+            logging.info("Captioning frames...")
+            start = time.perf_counter()
+            segments = []
+            for idx, group in enumerate(groups):
+                captions = [
+                    clean_action_name(screenshots_with_actions[member][1])
+                    for member in group
+                ]
+                with open(frame_paths[group[-1]], "rb") as frame_file:
+                    captioned = burn_caption(frame_file.read(), ". ".join(captions))
+                caption_path = os.path.join(
+                    temp_dir, f"caption_{idx}.{image_format(captioned)}"
+                )
+                with open(caption_path, "wb") as frame_file:
+                    frame_file.write(captioned)
+                segments.append(
+                    (caption_path, sum(caption_duration(text) for text in captions))
+                )
+            concatenated_audio_path = None
+            stages["captions"] = time.perf_counter() - start
+        else:
+            # First pass: Generate audio files and calculate durations
+            logging.info("Generating audio narrations...")
+            start = time.perf_counter()
+            # The cache counts over its lifetime, this report's share is the difference
+            hits, misses = self.narration_cache.hits, self.narration_cache.misses
+            narrations = self.generate_narrations(
+                [action_name for _, action_name in screenshots_with_actions]
+            )
+            stages["tts"] = time.perf_counter() - start
+            start = time.perf_counter()
+            all_audio_data, all_audio_lengths = [], []
+            for narration in narrations:
+                clip, segment_length = pad_narration(narration)
+                all_audio_data.append(clip)
+                all_audio_lengths.append(segment_length)
+            logging.info(
+                f"Narration cache: {self.narration_cache.hits - hits} hits, {self.narration_cache.misses - misses} misses"
+            )
+            write_narration_track(
+                all_audio_data, all_audio_lengths, concatenated_audio_path
+            )
+            stages["audio_concat"] = time.perf_counter() - start
+            segments = [
+                (
+                    frame_paths[group[-1]],
+                    sum(all_audio_lengths[member] for member in group),
+                )
+                for group in groups
+            ]
+
+        # Show each screenshot exactly once for the length of its narration
+        concat_list_path = os.path.join(temp_dir, "frames.txt")
+        write_concat_list(segments, concat_list_path)
+
+        # Size the bitrate from the known duration so the first pass fits the upload limit
+        total_duration = sum(length for _, length in segments)
+        video_kbps = video_bitrate_budget(
+            max_size_mb,
+            total_duration,
+            audio_kbps=0 if concatenated_audio_path is None else 128,
+        )
+        logging.info(
+            f"Encoding {total_duration:.1f}s of video with a {video_kbps}kbps video budget ({self.size_mode})"
+        )
+        passes = encode_still_video(
+            concat_list_path,
+            concatenated_audio_path,
+            output_path,
+            (width, height),
+            crf=23,
+            video_kbps=video_kbps,
+            two_pass=self.size_mode == "two-pass",
+            timings=stages,
+        )
+        file_size_mb = os.path.getsize(output_path) / (1024 * 1024)
+        if file_size_mb > max_size_mb:
+            # Rate control overshoot, retry once with an exact two-pass encode below the budget
+            logging.info(
+                f"Video size ({file_size_mb:.2f}MB) exceeds limit of {max_size_mb}MB. Re-encoding with two-pass bitrate control..."
+            )
+            retry_timings = {}
+            passes += encode_still_video(
+                concat_list_path,
+                concatenated_audio_path,
+                output_path,
+                (width, height),
+                video_kbps=int(video_kbps * (max_size_mb / file_size_mb) * 0.9),
+                two_pass=True,
+                timings=retry_timings,
+            )
+            for stage, seconds in retry_timings.items():
+                stages[f"retry_{stage}"] = seconds
+            file_size_mb = os.path.getsize(output_path) / (1024 * 1024)
+        stats = {
+            "duration": total_duration,
+            "frames": len(segments),
+            "video_kbps": video_kbps,
+            "passes": passes,
+            "size_mb": file_size_mb,
+            "stages": stages,
+        }
+        logging.info(
+            f"Video encoded in {passes} pass(es): {file_size_mb:.2f}MB of {max_size_mb}MB limit"
+        )
+
+        # Cleanup
+        logging.info("Cleaning up temporary files...")
+        shutil.rmtree(temp_dir)
+        return stats
+
+
+# Scenarios that should never share a shard, the two slowest ones
+SCENARIO_ANTI_AFFINITY = [{"chat_demo", "extensions_demo"}]
+
+
+def parse_shard(shard):
+    """
+    Parses a shard spec such as "2/4" into a 1-based (index, count) tuple
+
+    Args:
+        shard (str): Shard spec in the form index/count
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", shard or "1/1")
+    if not match:
+        raise Exception(f"Invalid shard '{shard}', expected index/count such as 1/2")
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1 or not 1 <= index <= count:
+        raise Exception(f"Invalid shard '{shard}', index must be between 1 and {count}")
+    return index, count
+
+
+def load_scenario_timings(timings_path):
+    """
+    Returns expected scenario durations in seconds recorded by earlier runs
+
+    Args:
+        timings_path (str): JSON file mapping scenario names to seconds
+    """
+    if not os.path.exists(timings_path):
+        return {}
+    with open(timings_path, "r") as f:
+        return json.load(f)
+
+
+def plan_shards(scenario_names, timings, shard_count, default_seconds=300):
+    """
+    Splits scenarios into shards of similar expected wall time, longest scenario first onto the least loaded shard
+
+    Args:
+        scenario_names (list): Scenario names to split
+        timings (dict): Expected seconds per scenario name
+        shard_count (int): Number of shards
+        default_seconds (float): Expected seconds for scenarios without a recorded timing
+    """
+    shards = [[] for _ in range(shard_count)]
+    loads = [0.0] * shard_count
+    for name in sorted(
+        scenario_names, key=lambda name: -timings.get(name, default_seconds)
+    ):
+        conflicts = set().union(
+            *[group - {name} for group in SCENARIO_ANTI_AFFINITY if name in group]
+        )
+        candidates = [
+            idx for idx in range(shard_count) if not conflicts.intersection(shards[idx])
+        ] or list(range(shard_count))
+        idx = min(candidates, key=lambda idx: loads[idx])
+        shards[idx].append(name)
+        loads[idx] += timings.get(name, default_seconds)
+    # Keep the suite's own order within a shard
+    return [[name for name in scenario_names if name in shard] for shard in shards]
+
+
+def merge_shard_results(results_paths, output_path, timings_path=None):
+    """
+    Combines per-shard results files into one, optionally recording scenario timings for the next split
+
+    Args:
+        results_paths (list): Results files written by each shard
+        output_path (str): Path of the merged results file
+        timings_path (str): Timings file to update with passed scenario durations
+    """
+    shards = []
+    for results_path in results_paths:
+        with open(results_path, "r") as f:
+            shards.append(json.load(f))
+    scenarios = [scenario for shard in shards for scenario in shard["scenarios"]]
+    merged = {
+        "shards": len(shards),
+        "passed": all(shard["passed"] for shard in shards),
+        "wall_seconds": max([shard["seconds"] for shard in shards] or [0]),
+        "scenarios": scenarios,
+        "errors": [error for shard in shards for error in shard.get("errors", [])],
+    }
+    with open(output_path, "w") as f:
+        json.dump(merged, f, indent=2)
+    if timings_path:
+        timings = load_scenario_timings(timings_path)
+        for scenario in scenarios:
+            if scenario["status"] == "passed":
+                timings[scenario["name"]] = round(scenario["seconds"], 1)
+        with open(timings_path, "w") as f:
+            json.dump(timings, f, indent=2, sort_keys=True)
+    logging.info(
+        f"Merged {len(shards)} shard results into {output_path}: {len(scenarios)} scenarios, {'passed' if merged['passed'] else 'failed'}"
+    )
+    return merged
+
+
+class FrontEndTest:
+    # Scenarios run after login, in order: (name, runner method)
+    SCENARIOS = [
+        ("extensions_demo", "run_extensions_demo_test"),
+        ("mandatory_context_demo", "run_mandatory_context_test"),
+        ("chat_demo", "run_chat_test"),
+        ("user_preferences_demo", "run_user_preferences_test"),
+        ("team_management_demo", "run_team_management_test"),
+    ]
+
+    def __init__(
+        self,
+        base_uri: str = "http://localhost:3437",
+        features: str = "",
+        shard: str = "",
+        scenarios: str = "",
+    ):
+        self.base_uri = base_uri
+        # Shard of the post-login scenarios this run executes, as index/count
+        if shard == "":
+            shard = os.environ.get("TEST_SHARD", "1/1")
+        self.shard_index, self.shard_count = parse_shard(shard)
+        shard_suffix = (
+            f"_shard_{self.shard_index}_of_{self.shard_count}"
+            if self.shard_count > 1
+            else ""
+        )
+        # Comma separated scenario names to run, all scenarios when empty
+        if scenarios == "":
+            scenarios = os.environ.get("TEST_SCENARIOS", "")
+        self.scenario_names = [
+            name.strip() for name in scenarios.split(",") if name.strip()
+        ]
+        self.scenario_timings_path = os.getenv(
+            "SCENARIO_TIMINGS_PATH", os.path.join(TESTS_DIR, "scenario_timings.json")
+        )
+        self.results_path = os.getenv(
+            "TEST_RESULTS_PATH",
+            os.path.join(
+                TESTS_DIR,
+                f"results_shard_{self.shard_index}_of_{self.shard_count}.json",
+            ),
+        )
+        self.scenario_results = []
+        self.run_started = time.time()
+        # What runs after login (TEST_MODE), options are:
+        # - scenarios: the feature scenarios with video reports
+        # - benchmark: route load performance against a baseline, see RouteBenchmark
+        # - chat-benchmark: chat answer streaming latency, see ChatStreamBenchmark
+        # - load: many concurrent virtual users running handlers, see run_load_test
+        self.test_mode = os.getenv("TEST_MODE", "scenarios").lower()
+        # Scenario the current steps belong to in the timing trace
+        self.scenario_name = "setup"
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.screenshots_dir = os.path.join(
+            "test_screenshots", f"test_run_{timestamp}{shard_suffix}"
+        )
+        os.makedirs(self.screenshots_dir, exist_ok=True)
+        # Per-step phase timings, one JSONL trace per scenario
+        self.timing_trace = TimingTrace(
+            os.getenv("TIMING_TRACE_DIR", os.path.join(self.screenshots_dir, "timings"))
+        )
+        # Backend traffic recording and replay (BACKEND_TRAFFIC=record|replay)
+        self.backend_traffic = BackendTraffic()
+        self.browser = None
+        self.context = None
+        self.page = None
+        self.popup = None
+        self.playwright = None
+        self.screenshots_with_actions = []
+        # Virtual users in load mode can skip screenshots entirely
+        self.capture_screenshots = True
+        # Screenshot capture format (SCREENSHOT_FORMAT), options are png, jpeg and webp
+        self.screenshot_format = os.getenv("SCREENSHOT_FORMAT", "png").lower()
+        # Quality of lossy screenshot formats, 0-100
+        self.screenshot_quality = int(os.getenv("SCREENSHOT_QUALITY", "80"))
+        self.frame_store = FrameStore()
+        # Only push screenshots into notebook output when someone is watching
+        self.display_screenshots = (
+            os.getenv(
+                "DISPLAY_SCREENSHOTS",
+                (
+                    "true"
+                    if get_ipython() is not None and not os.getenv("CI")
+                    else "false"
+                ),
+            ).lower()
+            == "true"
+        )
+        # How test steps wait for the page (SETTLE_MODE), options are:
+        # - adaptive: wait until the page is quiescent, bounded by SETTLE_MAX_WAIT per wait
+        #   and SETTLE_STEP_MAX_WAIT per step
+        # - fixed: the original fixed sleeps around every step
+        self.settle_mode = os.getenv("SETTLE_MODE", "adaptive").lower()
+        self.settler = PageSettler()
+        # End of the running test step's settle budget, None outside test_action
+        self.settle_deadline = None
+        # Size targeting for report videos (REPORT_SIZE_MODE), options are:
+        # - capped: constant quality capped at the bitrate budget (single pass)
+        # - two-pass: two-pass average bitrate at the bitrate budget
+        # Report narration (REPORT_NARRATION), options are:
+        # - tts: narrate every step through EZLOCALAI_URI, for release runs
+        # - captions: silent videos with the step burned in as a caption, for quick PR builds
+        # - auto: captions when EZLOCALAI_URI is not set, otherwise tts
+        self.report_renderer = VideoReportRenderer()
+        self.last_report_stats = None
+        # Worker processes rendering reports while the browser moves on, 0 renders inline
+        self.report_workers = int(os.getenv("REPORT_WORKERS", "2"))
+        self.report_pool = None
+        # Streamed reports are finished in threads, their encoders already hold the frames
+        self.report_threads = ThreadPoolExecutor(
+            max_workers=max(1, self.report_workers)
+        )
+        self.pending_reports = []
+        # Report videos are uploaded to Discord in the background
+        self.uploader = DiscordUploader()
+        # Encode report videos in the background while each scenario runs
+        self.stream_reports = os.getenv("STREAM_REPORTS", "").lower() == "true"
+        self.report_stream = None
+        # Elements screenshots were focused on, zoomed into by the report (REPORT_CROP)
+        self.report_regions = {}
+        # Post-login scenarios run at once, each in its own BrowserContext
+        self.scenario_concurrency = int(os.getenv("SCENARIO_CONCURRENCY", "1"))
+        # Authenticated storage state snapshot, saved after the first verified login
+        self.email = None
+        self.mfa_token = None
+        # otpauth URI returned by the registration request, read by handle_mfa_screen
+        self.registration_otp_uri = None
+        self.storage_state = None
+        # Scoped to this run, so another run's session in the shared temp dir is never used
+        self.storage_state_path = os.getenv(
+            "STORAGE_STATE_PATH",
+            os.path.join(
+                tempfile.gettempdir(),
+                f"agixt-interactive-storage-state-{uuid.uuid4().hex}{shard_suffix}.json",
+            ),
+        )
+        self.storage_state_lock = asyncio.Lock()
+        # AGiXT backend, AGIXT_URI can point at tests/MockAGiXT.py for hermetic runs
+        self.agixt = AGiXTSDK(base_uri=os.getenv("AGIXT_URI", "https://api.agixt.dev"))
+        self.agixt.register_user(
+            email=f"{uuid.uuid4()}@example.com", first_name="Test", last_name="User"
+        )
+        # Ask the agent to judge every screenshot in the background (VERIFY_SCREENSHOTS)
+        self.verifier = (
+            ScreenshotVerifier(self.agixt)
+            if os.getenv("VERIFY_SCREENSHOTS", "").lower() == "true"
+            else None
+        )
+        self.pending_verifications = []
+        # Compare every screenshot with the last green run first (VISUAL_REGRESSION)
+        self.visual_baseline = (
+            VisualBaseline(os.path.join(self.screenshots_dir, "visual_diff"))
+            if os.getenv("VISUAL_REGRESSION", "true").lower() == "true"
+            else None
+        )
+        # Features are comma separated, options are:
+        # - stripe
+        # - email
+        # - google
+        if features == "":
+            features = os.environ.get("features", "")
+        if features == "":
+            self.features = []
+        elif "," in features:
+            self.features = features.split(",")
+        else:
+            self.features = [features]
+        if "," in features:
+            self.features = features.split(",")
+        else:
+            if features != "":
+                self.features = [features]
+
+    async def take_screenshot(
+        self, action_name, no_sleep=False, frame=None, focus=None
+    ):
+        if not self.capture_screenshots:
+            return None
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        sanitized_action_name = re.sub(r"[^a-zA-Z0-9_-]", "_", action_name)
+        extension = (
+            "jpg" if self.screenshot_format == "jpeg" else self.screenshot_format
+        )
+        screenshot_path = os.path.join(
+            self.screenshots_dir, f"{timestamp}_{sanitized_action_name}.{extension}"
+        )
+        logging.info(
+            f"[{timestamp}] Action: {action_name} - Screenshot path: {screenshot_path}"
+        )
+        target = self.popup if self.popup else self.page
+        logging.info(
+            f"Screenshotting { 'popup' if self.popup else 'page'} at {target.url}"
+        )
+        if frame is not None:
+            # Reuse a frame that was already captured, e.g. by wait_until_visually_stable
+            screenshot = frame
+        else:
+            if not no_sleep:
+                with self.timing_phase(action_name, "screenshot_settle"):
+                    if self.settle_mode == "fixed":
+                        await target.wait_for_timeout(2000)
+                    else:
+                        await self.settler.wait(
+                            target,
+                            f"screenshot: {action_name}",
+                            max_wait=self.settle_budget(),
+                        )
+            with self.timing_phase(action_name, "screenshot_capture"):
+                screenshot = await self.capture_frame(target)
+
+        if not screenshot:
+            raise Exception(f"Failed to capture screenshot on action: {action_name}")
+
+        # Add screenshot and action to the list
+        with self.timing_phase(action_name, "screenshot_write"):
+            self.frame_store.add(screenshot_path, screenshot)
+        self.screenshots_with_actions.append((screenshot_path, action_name))
+        visual = None
+        if self.visual_baseline:
+            with self.timing_phase(action_name, "visual_compare"):
+                masks = await self.visual_baseline.volatile_rects(target)
+                # The comparison is CPU bound, keep the event loop free while it runs
+                visual = await asyncio.to_thread(
+                    self.visual_baseline.compare,
+                    self.scenario_name,
+                    action_name,
+                    screenshot,
+                    masks,
+                )
+        # Steps that look the same as in the last green run don't need the agent
+        if self.verifier and (visual is None or visual["status"] != "match"):
+            await self.prompt_agent(action_name, screenshot_path)
+        if focus:
+            # The report zooms into this element instead of showing the whole page
+            region = await target.locator(focus).first.bounding_box()
+            if region:
+                self.report_regions[screenshot_path] = region
+
+        if self.stream_reports and not is_desktop():
+            if self.report_stream is None:
+                self.report_stream = StreamingReportEncoder(
+                    self.report_renderer.narrate_action,
+                    concurrency=self.report_renderer.narration_concurrency,
+                    captions=self.report_renderer.narration == "captions",
+                    width=self.report_renderer.width,
+                )
+            self.report_stream.add_frame(screenshot, action_name)
+
+        if self.display_screenshots and self.screenshot_format != "webp":
+            with self.timing_phase(action_name, "screenshot_display"):
+                display(Image(data=screenshot, format=self.screenshot_format))
+        return screenshot_path
+
+    def timing_phase(self, step, phase):
+        """
+        Times a phase of a step of the current scenario in the timing trace
+
+        Args:
+            step (str): Test action or screenshot description
+            phase (str): Phase of the step
+        """
+        return self.timing_trace.phase(self.scenario_name, step, phase)
+
+    async def capture_frame(self, target=None):
+        """Captures the page or popup in the configured screenshot format and returns the encoded bytes"""
+        target = target or (self.popup if self.popup else self.page)
+        if self.screenshot_format == "jpeg":
+            return await target.screenshot(type="jpeg", quality=self.screenshot_quality)
+        screenshot = await target.screenshot()
+        if self.screenshot_format == "webp":
+            screenshot = cv2.imencode(
+                ".webp",
+                cv2.imdecode(np.frombuffer(screenshot, np.uint8), cv2.IMREAD_COLOR),
+                [cv2.IMWRITE_WEBP_QUALITY, self.screenshot_quality],
+            )[1].tobytes()
+        return screenshot
+
+    async def wait_until_visually_stable(
+        self, region=None, threshold=None, max_wait=10.0, interval=0.25
+    ):
+        """
+        Captures frames at a short interval until consecutive frames stop changing.
+
+        Frames are captured at a quarter of the resolution, clipped to the region, and compared
+        as grayscale images, so the check stays cheap. The returned frame is a full capture
+        taken once the page is stable, so it can be passed to take_screenshot. In fixed settle
+        mode this sleeps for max_wait and captures once.
+
+        Args:
+            region (dict): Optional {"x", "y", "width", "height"} area of the page to watch
+            threshold (float): Mean absolute pixel difference (0-255) below which frames count as unchanged. Defaults to VISUAL_STABILITY_THRESHOLD or 1.0.
+            max_wait (float): Upper bound in seconds
+            interval (float): Delay between captures in seconds
+
+        Returns:
+            bytes: The last captured frame
+        """
+        if threshold is None:
+            threshold = float(os.getenv("VISUAL_STABILITY_THRESHOLD", "1.0"))
+        target = self.popup if self.popup else self.page
+        if self.settle_mode == "fixed":
+            await asyncio.sleep(max_wait)
+            return await self.capture_frame(target)
+        start = time.monotonic()
+        previous = None
+        while True:
+            image = cv2.imdecode(
+                np.frombuffer(await self.capture_probe(target, region), np.uint8),
+                cv2.IMREAD_GRAYSCALE,
+            )
+            if (
+                previous is not None
+                and previous.shape == image.shape
+                and float(np.mean(cv2.absdiff(image, previous))) < threshold
+            ):
+                logging.info(
+                    f"Page visually stable after {time.monotonic() - start:.2f}s"
+                )
+                return await self.capture_frame(target)
+            if time.monotonic() - start >= max_wait:
+                logging.info(f"Page still changing after {max_wait}s, continuing")
+                return await self.capture_frame(target)
+            previous = image
+            await asyncio.sleep(interval)
+
+    async def capture_probe(self, target, region=None, scale=0.25):
+        """
+        Captures a small JPEG of the page or a region of it for change detection
+
+        Args:
+            target (Page): Page or popup to capture
+            region (dict): Optional {"x", "y", "width", "height"} area to capture
+            scale (float): Scale of the capture relative to the page
+        """
+        clip = region or {
+            "x": 0,
+            "y": 0,
+            **(target.viewport_size or {"width": 1367, "height": 924}),
+        }
+        try:
+            # Chromium renders the capture at the reduced scale, so it is cheap to take and decode
+            session = await target.context.new_cdp_session(target)
+            try:
+                result = await session.send(
+                    "Page.captureScreenshot",
+                    {
+                        "format": "jpeg",
+                        "quality": 60,
+                        "clip": {**clip, "scale": scale},
+                    },
+                )
+            finally:
+                await session.detach()
+            return base64.b64decode(result["data"])
+        except Exception:
+            return await target.screenshot(type="jpeg", quality=60, clip=clip)
+
+    def report_frames(self):
+        """Returns the scenario's (frame, action_name) pairs with buffered frames as bytes"""
+        return [
+            (self.frame_store.snapshot(screenshot_path), action_name)
+            for screenshot_path, action_name in self.screenshots_with_actions
+        ]
+
+    def report_focus(self):
+        """Returns the focus region of each of the scenario's screenshots, or None"""
+        return [
+            self.report_regions.get(screenshot_path)
+            for screenshot_path, _ in self.screenshots_with_actions
+        ]
+
+    def reset_screenshots(self):
+        """Clears collected screenshots and discards any unfinished report stream before the next scenario"""
+        self.screenshots_with_actions = []
+        self.report_regions = {}
+        self.frame_store.clear()
+        if self.report_stream is not None:
+            self.report_stream.close()
+            self.report_stream = None
+
+    def send_video_to_discord(
+        self, video_path, demo_name, test_status="✅ Test passed"
+    ):
+        """
+        Queue a video to be sent to Discord with contextual information
+
+        Args:
+            video_path (str): Path to the video file
+            demo_name (str): Name of the demo/test for the message
+            test_status (str): Status prefix for the message
+        """
+        self.uploader.submit(video_path, demo_name, test_status)
+
+    def create_video_report(
+        self,
+        video_name="report",
+        max_size_mb=10,
+        test_status="✅ Test passed",
+        frames=None,
+        regions=None,
+        report_stream=None,
+    ):
+        """
+        Creates a video from all screenshots taken during the test run with TTS narration.
+        Each screenshot is shown once for the length of its narration and encoded with FFMPEG
+        in a single pass, with the bitrate budgeted from the total duration so the output fits
+        the size limit on the first pass.
+
+        Args:
+            max_size_mb (int): Maximum size of the output video in MB. Defaults to 10.
+            frames (list): (frame, action_name) pairs to render, defaults to the scenario's screenshots
+            regions (list): Focus region per frame, defaults to the scenario's
+            report_stream (StreamingReportEncoder): Streamed report to finish, defaults to the scenario's
+        """
+
+        if is_desktop():
+            return None
+        try:
+            if frames is None:
+                frames = self.report_frames()
+            if regions is None:
+                regions = self.report_focus()
+            if report_stream is None:
+                report_stream, self.report_stream = self.report_stream, None
+            if not frames:
+                logging.warning("No screenshots found to create video")
+                return None
 
-                # If still too large, reduce fps and maintain high compression
-                if file_size_mb > max_size_mb:
-                    # Calculate new fps based on size ratio with some extra buffer
-                    new_fps = int(
-                        initial_fps * (max_size_mb / file_size_mb) * 0.85
-                    )  # 15% buffer
-                    new_fps = max(new_fps, 10)  # Don't go below 10 fps
+            # Create paths for our files
+            # Use video_name to create properly named files in tests/ directory
+            tests_dir = os.path.join(os.getcwd(), "tests")
+            os.makedirs(tests_dir, exist_ok=True)
+            final_video_path = os.path.abspath(
+                os.path.join(tests_dir, f"{video_name}.mp4")
+            )
+            demo_name = video_name.replace("_", " ").title()
 
+            if report_stream is not None:
+                logging.info("Finishing streamed video report...")
+                with self.timing_trace.phase(video_name, "report", "stream_finish"):
+                    streamed = report_stream.finish(final_video_path)
+                if streamed:
+                    file_size_mb = os.path.getsize(final_video_path) / (1024 * 1024)
+                    if file_size_mb <= max_size_mb:
+                        logging.info(
+                            f"Video report created successfully at: {final_video_path} (Size: {file_size_mb:.2f}MB)"
+                        )
+                        if demo_name != "Report":
+                            self.send_video_report(
+                                final_video_path, video_name, test_status
+                            )
+                        return final_video_path
                     logging.info(
-                        f"Recreating video with {new_fps} fps and high compression..."
+                        f"Streamed video ({file_size_mb:.2f}MB) exceeds limit of {max_size_mb}MB, re-rendering from screenshots"
                     )
-                    silent_video_path, total_frames = create_video(new_fps)
-                    combine_video_audio(
-                        silent_video_path,
-                        concatenated_audio_path,
-                        final_video_path,
-                        crf=28,
+                else:
+                    logging.warning(
+                        "Streamed video report failed, rendering from screenshots"
                     )
 
-            # Cleanup
-            logging.info("Cleaning up temporary files...")
-            shutil.rmtree(temp_dir)
+            stats = self.report_renderer.render(
+                frames,
+                final_video_path,
+                max_size_mb,
+                regions,
+            )
+            if stats is None:
+                return None
+            self.last_report_stats = {"video_name": video_name, **stats}
+            self.record_report_stages(video_name, stats)
 
             if not os.path.exists(final_video_path):
                 logging.error("Video file was not created successfully")
@@ -425,9 +3365,8 @@ class FrontEndTest:
             )
 
             # Send video to Discord immediately after creation
-            demo_name = video_name.replace("_", " ").title()
             if demo_name != "Report":
-                self.send_video_to_discord(final_video_path, demo_name, test_status)
+                self.send_video_report(final_video_path, video_name, test_status)
 
             return final_video_path
 
@@ -435,46 +3374,207 @@ class FrontEndTest:
             logging.error(f"Error creating video report: {e}")
             return None
 
-    async def prompt_agent(self, action_name, screenshot_path):
+    def record_report_stages(self, video_name, stats):
+        """Adds the render stage timings of a video report to the timing trace"""
+        for stage, seconds in stats.get("stages", {}).items():
+            self.timing_trace.record(video_name, "report", stage, seconds)
+
+    def send_video_report(self, video_path, video_name, test_status):
+        """Queues a rendered video report for Discord, with the upload timed in the timing trace"""
+        self.uploader.submit(
+            video_path,
+            video_name.replace("_", " ").title(),
+            test_status,
+            on_done=lambda sent, seconds: self.timing_trace.record(
+                video_name, "report", "discord_upload", seconds
+            ),
+        )
 
-        prompt = f"""The goal will be to view the screenshot and determine if the action was successful or not.
+    def start_report_pool(self):
+        if self.report_pool is None and self.report_workers > 0:
+            # Spawned workers avoid forking the browser driver's threads
+            self.report_pool = ProcessPoolExecutor(
+                max_workers=self.report_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
 
-        The action we were trying to perform was: {action_name}
+    def queue_video_report(
+        self, video_name="report", max_size_mb=10, test_status="✅ Test passed"
+    ):
+        """
+        Snapshots the scenario's screenshots and renders its video report in a worker process,
+        so the browser can continue with the next scenario while the report encodes. The video
+        is sent to Discord once rendering finishes. A streamed report is finished in a thread
+        instead. Falls back to create_video_report when report workers are disabled.
 
-        This screenshot shows the result of the action.
+        Args:
+            video_name (str): Name of the video file and demo
+            max_size_mb (int): Maximum size of the output video in MB. Defaults to 10.
+            test_status (str): Status prefix for the Discord message
 
-        In your <answer> block, respond with only one word `True` if the screenshot is as expected, to indicate if the action was successful. If the action was not successful, explain why in the <answer> block, this will be sent to the developers as the error in the test.
+        Returns:
+            str: Path the video report will be written to
+        """
+        if is_desktop() or not self.screenshots_with_actions:
+            return self.create_video_report(video_name, max_size_mb, test_status)
+        tests_dir = os.path.join(os.getcwd(), "tests")
+        os.makedirs(tests_dir, exist_ok=True)
+        final_video_path = os.path.abspath(os.path.join(tests_dir, f"{video_name}.mp4"))
+        if self.report_stream is not None:
+            # Finishing waits for the last narration and the mux, keep the event loop free
+            report_stream, self.report_stream = self.report_stream, None
+            self.pending_reports.append(
+                self.report_threads.submit(
+                    self.create_video_report,
+                    video_name,
+                    max_size_mb,
+                    test_status,
+                    self.report_frames(),
+                    self.report_focus(),
+                    report_stream,
+                )
+            )
+            logging.info(f"Queued streamed video report {video_name} to finish")
+            return final_video_path
+        if self.report_workers <= 0:
+            return self.create_video_report(video_name, max_size_mb, test_status)
+        self.start_report_pool()
+        future = self.report_pool.submit(
+            self.report_renderer.render,
+            self.report_frames(),
+            final_video_path,
+            max_size_mb,
+            self.report_focus(),
+        )
+        logging.info(f"Queued video report {video_name} for rendering")
+
+        def report_rendered(future):
+            try:
+                stats = future.result()
+            except Exception as e:
+                logging.error(f"Error creating video report {video_name}: {e}")
+                return
+            if stats is None or not os.path.exists(final_video_path):
+                logging.error(f"Video report {video_name} was not created successfully")
+                return
+            self.last_report_stats = {"video_name": video_name, **stats}
+            self.record_report_stages(video_name, stats)
+            logging.info(
+                f"Video report created successfully at: {final_video_path} (Size: {stats['size_mb']:.2f}MB)"
+            )
+            demo_name = video_name.replace("_", " ").title()
+            if demo_name != "Report":
+                self.send_video_report(final_video_path, video_name, test_status)
+
+        future.add_done_callback(report_rendered)
+        self.pending_reports.append(future)
+        return final_video_path
+
+    async def wait_for_reports(self):
+        """Waits for all queued video reports to finish rendering and uploading"""
+        if self.pending_reports:
+            logging.info(
+                f"Waiting for {len(self.pending_reports)} queued video reports..."
+            )
+            await asyncio.gather(
+                *[asyncio.wrap_future(future) for future in self.pending_reports],
+                return_exceptions=True,
+            )
+            self.pending_reports = []
+        if self.report_pool is not None:
+            self.report_pool.shutdown(wait=True)
+            self.report_pool = None
+        # Uploads are queued by the render callbacks, so drain them last
+        self.uploader.flush()
+
+    async def prompt_agent(self, action_name, screenshot_path):
         """
-        with open(screenshot_path, "rb") as f:
-            screenshot = f.read().decode("utf-8")
-        screenshot = f"data:image/png;base64,{screenshot}"
-        response = self.agixt.prompt_agent(
-            agent_name="XT",
-            prompt_name="Think About It",
-            prompt_args={"user_input": prompt, "file_urls": [screenshot]},
+        Queues a screenshot for the agent to judge, checked by check_verifications at the end of the scenario
+
+        Args:
+            action_name (str): Action the screenshot is the result of
+            screenshot_path (str): Path of the screenshot in the frame store
+        """
+        self.pending_verifications.append(
+            self.verifier.submit(action_name, self.frame_store.get(screenshot_path))
         )
-        logging.info(f"Agent response: {response}")
-        updated_response = re.sub(r"[^a-zA-Z]", "", response).lower()
-        if updated_response != "true":
+
+    async def finish_scenario(self):
+        """Raises if screenshot verifications failed, otherwise promotes the scenario's screenshots to visual baselines"""
+        await self.check_verifications()
+        if self.visual_baseline:
+            self.visual_baseline.promote(self.scenario_name)
+
+    def log_time_sinks(self):
+        """Logs the phases and steps of the run that took the most time"""
+        if self.timing_trace.records:
+            logging.info(
+                f"Top time sinks (traces in {self.timing_trace.trace_dir}):\n{self.timing_trace.summary()}"
+            )
+
+    def write_visual_report(self):
+        """Writes the HTML report of the steps that differ from their visual baseline"""
+        if not self.visual_baseline:
+            return
+        report_path = self.visual_baseline.write_report()
+        if report_path:
+            logging.info(f"Steps that changed since the last green run: {report_path}")
+
+    async def check_verifications(self):
+        """Waits for the scenario's queued screenshot verifications and raises if any failed"""
+        if not self.pending_verifications:
+            return
+        pending, self.pending_verifications = self.pending_verifications, []
+        verdicts = await asyncio.gather(
+            *[asyncio.wrap_future(future) for future in pending]
+        )
+        failures = [verdict for verdict in verdicts if verdict]
+        if failures:
             raise Exception(
-                f"Action failed: {action_name}\nAI suggested the action was not successful:\n{response}"
+                f"{len(failures)} of {len(verdicts)} screenshot verifications failed:\n"
+                + "\n".join(failures)
             )
 
+    async def decode_qr_code(self, timeout=15.0, interval=0.25):
+        """
+        Polls the enrollment QR code until it decodes and returns its data
+
+        Args:
+            timeout (float): Seconds to keep trying before giving up
+            interval (float): Seconds between attempts
+        """
+        # react-qr-code renders an svg with a 256x256 viewBox
+        qr_code = self.page.locator('svg[viewBox="0 0 256 256"]').first
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                target = qr_code if await qr_code.count() else self.page
+                image = cv2.imdecode(
+                    np.frombuffer(await target.screenshot(timeout=2000), np.uint8),
+                    cv2.IMREAD_GRAYSCALE,
+                )
+                # The svg has no quiet zone of its own
+                image = cv2.copyMakeBorder(
+                    image, 16, 16, 16, 16, cv2.BORDER_CONSTANT, value=255
+                )
+                for obj in decode(image):
+                    if obj.type == "QRCODE":
+                        return obj.data.decode("utf-8")
+            except Exception as e:
+                logging.info(f"QR code not readable yet: {e}")
+            if time.monotonic() >= deadline:
+                raise Exception("Failed to decode QR code")
+            await asyncio.sleep(interval)
+
     async def handle_mfa_screen(self):
         """Handle MFA screenshot"""
-        # Decode QR code from screenshot
-        await asyncio.sleep(2)
-        # await self.take_screenshot(f"Screenshot prior to attempting to decode QR code")
-        nparr = np.frombuffer(await self.page.screenshot(), np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        otp_uri = None
-        decoded_objects = decode(img)
-        for obj in decoded_objects:
-            if obj.type == "QRCODE":
-                otp_uri = obj.data.decode("utf-8")
-                break
+        # The registration response and the login URL carry the otpauth URI, the QR code is the fallback
+        otp_uri = self.registration_otp_uri
         if not otp_uri:
-            raise Exception("Failed to decode QR code")
+            match = re.search(r"otpauth://\S+", unquote(self.page.url))
+            otp_uri = match.group(0) if match else None
+        if not otp_uri:
+            otp_uri = await self.decode_qr_code()
         logging.info(f"Retrieved OTP URI: {otp_uri}")
         match = re.search(r"secret=([\w\d]+)", otp_uri)
         if match:
@@ -493,6 +3593,23 @@ class FrontEndTest:
             raise Exception("Failed to extract secret key from OTP URI")
         return secret_key
 
+    async def settle(self, label=""):
+        """Waits for the active page to settle, or sleeps 5 seconds in fixed settle mode"""
+        if self.settle_mode == "fixed":
+            await asyncio.sleep(5)
+            return
+        await self.settler.wait(
+            self.popup if self.popup else self.page,
+            label,
+            max_wait=self.settle_budget(),
+        )
+
+    def settle_budget(self):
+        """Returns the seconds left of the running test step's settle budget, or None outside a step"""
+        if self.settle_deadline is None:
+            return None
+        return max(self.settle_deadline - time.monotonic(), 0.0)
+
     async def test_action(
         self, action_description, action_function, followup_function=None
     ):
@@ -503,20 +3620,31 @@ class FrontEndTest:
             action_description (str): Description of the action being performed
             action_function (callable): Function to perform the action (async)
         """
+        # The settle waits before, after and for the screenshot of this step share one budget
+        outer_deadline = self.settle_deadline
+        self.settle_deadline = time.monotonic() + self.settler.step_max_wait
         try:
             logging.info(action_description)
-            await asyncio.sleep(5)
-            await self.page.wait_for_load_state("domcontentloaded", timeout=90000)
-            result = await action_function()
-            await self.page.wait_for_load_state("domcontentloaded", timeout=90000)
-            await asyncio.sleep(5)
+            with self.timing_phase(action_description, "pre_settle"):
+                await self.settle(f"before: {action_description}")
+            with self.timing_phase(action_description, "load_state"):
+                await self.page.wait_for_load_state("domcontentloaded", timeout=90000)
+            with self.timing_phase(action_description, "action"):
+                result = await action_function()
+            with self.timing_phase(action_description, "load_state"):
+                await self.page.wait_for_load_state("domcontentloaded", timeout=90000)
+            with self.timing_phase(action_description, "post_settle"):
+                await self.settle(f"after: {action_description}")
             if followup_function:
-                await followup_function()
+                with self.timing_phase(action_description, "followup"):
+                    await followup_function()
             await self.take_screenshot(f"{action_description}")
             return result
         except Exception as e:
             logging.error(f"Failed {action_description}: {e}")
             raise Exception(f"Failed {action_description}: {e}")
+        finally:
+            self.settle_deadline = outer_deadline
 
     async def handle_register(self):
         """Handle the registration process"""
@@ -544,10 +3672,25 @@ class FrontEndTest:
             lambda: self.page.fill("#last_name", last_name),
         )
 
-        await self.test_action(
-            "With all the required information filled in, we'll click 'Register' to create our account. This will automatically set up multi-factor authentication for security.",
-            lambda: self.page.click('button[type="submit"]'),
-        )
+        async def registration_response(response):
+            if response.request.method != "POST" or not urlparse(
+                response.url
+            ).path.endswith("/v1/user"):
+                return
+            try:
+                self.registration_otp_uri = (await response.json()).get("otp_uri")
+            except Exception:
+                pass
+
+        self.registration_otp_uri = None
+        self.page.on("response", registration_response)
+        try:
+            await self.test_action(
+                "With all the required information filled in, we'll click 'Register' to create our account. This will automatically set up multi-factor authentication for security.",
+                lambda: self.page.click('button[type="submit"]'),
+            )
+        finally:
+            self.page.remove_listener("response", registration_response)
 
         mfa_token = await self.test_action(
             "After registration, we'll automatically scan the QR code and enter the one-time password to complete setup and gain access to the application.",
@@ -640,6 +3783,7 @@ class FrontEndTest:
                     "Can you show be a basic 'hello world' Python example?",
                 ),
             )
+            await self.page.evaluate(CHAT_STREAM_OBSERVER_SCRIPT)
             await self.test_action(
                 "When you're ready, just press Enter or click the send button. The AI will begin processing your request and thinking through the best response.",
                 lambda: self.page.press("#chat-message-input-active", "Enter"),
@@ -647,6 +3791,13 @@ class FrontEndTest:
 
             await asyncio.sleep(90)
 
+            state = await self.page.evaluate(CHAT_STREAM_STATE_SCRIPT)
+            if state and state["firstContentAt"] is not None:
+                metrics = chat_stream_metrics(state)
+                logging.info(
+                    f"Chat answer: first content after {metrics['ttft_ms']:.0f}ms, last update after {metrics['complete_ms']:.0f}ms, {metrics['chars']} chars in {metrics['updates']} updates"
+                )
+
             await self.take_screenshot(
                 "The AI has responded with a complete answer, showing both the code example and its thought process. Notice how it also automatically names the conversation based on our question."
             )
@@ -949,10 +4100,83 @@ class FrontEndTest:
                 "The system has authenticated us successfully and we're now logged into the main application interface.",
                 lambda: self.verify_login_success(),
             )
+            self.email = email
+            self.mfa_token = mfa_token
+            await self.save_storage_state()
         except Exception as e:
             logging.error(f"Error during login: {e}")
             raise Exception(f"Error during login: {str(e)}")
 
+    async def save_storage_state(self, context=None):
+        """
+        Snapshots the authenticated storage state so new contexts can start logged in
+
+        Args:
+            context (BrowserContext): Context to snapshot, defaults to the active page's context
+        """
+        context = context or self.page.context
+        self.storage_state = await context.storage_state(path=self.storage_state_path)
+        logging.info(f"Saved authenticated storage state to {self.storage_state_path}")
+
+    def storage_state_expired(self, storage_state=None, leeway=60):
+        """
+        Returns True when a storage state has no jwt cookie, or the cookie or its token expires within leeway seconds
+
+        Args:
+            storage_state (dict): Playwright storage state, defaults to the saved snapshot
+            leeway (int): Seconds before expiry at which the session is treated as expired
+        """
+        storage_state = storage_state or self.storage_state
+        if not storage_state:
+            return True
+        cookie = next(
+            (c for c in storage_state.get("cookies", []) if c.get("name") == "jwt"),
+            None,
+        )
+        if cookie is None:
+            return True
+        deadline = time.time() + leeway
+        if 0 < cookie.get("expires", -1) < deadline:
+            return True
+        try:
+            payload = cookie["value"].split(".")[1]
+            claims = json.loads(
+                base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4))
+            )
+        except Exception:
+            # Not a readable JWT, the cookie expiry is all there is to go on
+            return False
+        return claims.get("exp", deadline + 1) < deadline
+
+    async def refresh_storage_state(self):
+        """Logs in again through the UI in a throwaway context and snapshots the new session"""
+        if not self.email:
+            raise Exception("Cannot refresh the session before the first login")
+        logging.info("Authenticated session expired, logging in again")
+        login = await self.scenario_session(
+            "session_refresh", authenticated=False, reports=False
+        )
+        try:
+            await login.handle_login(self.email, self.mfa_token)
+            self.storage_state = login.storage_state
+        finally:
+            await login.context.close()
+
+    async def authenticated_storage_state(self):
+        """Returns a storage state that starts new contexts logged in, logging in again when it has expired"""
+        async with self.storage_state_lock:
+            if (
+                self.storage_state is None
+                and os.path.exists(self.storage_state_path)
+                # A snapshot from before this run may belong to another user
+                and os.path.getmtime(self.storage_state_path) >= self.run_started
+            ):
+                with open(self.storage_state_path, "r") as f:
+                    self.storage_state = json.load(f)
+            if self.storage_state_expired():
+                await self.refresh_storage_state()
+            return self.storage_state
+
     async def verify_login_success(self):
         """Verify login success by checking for authenticated UI elements with multiple fallbacks"""
         try:
@@ -1407,13 +4631,28 @@ class FrontEndTest:
             "Now we'll submit the payment to complete our subscription upgrade.",
             lambda: self.page.click("button.SubmitButton.SubmitButton--complete"),
         )
-        await self.page.wait_for_timeout(15000)
+        # Stripe redirects back to the app once the payment went through. As with the fixed
+        # wait this replaces, a slow checkout is not a failure, the screenshot below shows it
+        try:
+            await self.page.wait_for_url(
+                lambda url: not url.startswith("https://checkout.stripe.com"),
+                timeout=60000,
+            )
+        except Exception as e:
+            logging.warning(f"Stripe checkout did not redirect back: {e}")
+        frame = await self.wait_until_visually_stable(max_wait=5)
         await self.take_screenshot(
-            "The payment has been processed successfully and your subscription is now active."
+            "The payment has been processed successfully and your subscription is now active.",
+            frame=frame,
         )
 
-    async def run_registration_test(self):
-        """Run registration test and create video"""
+    async def run_registration_test(self, report=True):
+        """
+        Run registration test and create video
+
+        Args:
+            report (bool): Create the video report, shards after the first only register their own user
+        """
         try:
             logging.info(f"Navigating to {self.base_uri}")
             await self.page.goto(self.base_uri)
@@ -1430,12 +4669,14 @@ class FrontEndTest:
             if "google" not in self.features:
                 try:
                     email, mfa_token = await self.handle_register()
-                    video_path = self.create_video_report(
-                        video_name="registration_demo"
-                    )
-                    logging.info(
-                        f"Registration test complete. Video report created at {video_path}"
-                    )
+                    await self.check_verifications()
+                    if report:
+                        video_path = self.queue_video_report(
+                            video_name="registration_demo"
+                        )
+                        logging.info(
+                            f"Registration test complete. Video report created at {video_path}"
+                        )
                     return email, mfa_token
                 except Exception as e:
                     logging.error(f"Error registering user: {e}")
@@ -1443,10 +4684,12 @@ class FrontEndTest:
             elif "google" in self.features:
                 email = await self.handle_google()
                 mfa_token = ""
-                video_path = self.create_video_report(video_name="google_oauth_demo")
-                logging.info(
-                    f"Google OAuth test complete. Video report created at {video_path}"
-                )
+                await self.check_verifications()
+                if report:
+                    video_path = self.queue_video_report(video_name="google_oauth_demo")
+                    logging.info(
+                        f"Google OAuth test complete. Video report created at {video_path}"
+                    )
                 return email, mfa_token
 
         except Exception as e:
@@ -1454,21 +4697,32 @@ class FrontEndTest:
             if not os.path.exists(
                 os.path.join(os.getcwd(), "tests", "registration_demo.mp4")
             ):
-                self.create_video_report(
+                self.queue_video_report(
                     video_name="registration_demo", test_status="❌ **TEST FAILURE**"
                 )
             raise e
 
-    async def run_login_test(self, email, mfa_token):
-        """Run login test and create video"""
+    async def run_login_test(self, email, mfa_token, report=True):
+        """
+        Run login test and create video
+
+        Args:
+            email (str): Email of the registered test user
+            mfa_token (str): MFA secret of the registered test user
+            report (bool): Create the video report, shards after the first only log in
+        """
         try:
             await self.handle_login(email, mfa_token)
-            video_path = self.create_video_report(video_name="login_demo")
-            logging.info(f"Login test complete. Video report created at {video_path}")
+            await self.check_verifications()
+            if report:
+                video_path = self.queue_video_report(video_name="login_demo")
+                logging.info(
+                    f"Login test complete. Video report created at {video_path}"
+                )
         except Exception as e:
             logging.error(f"Login test failed: {e}")
             if not os.path.exists(os.path.join(os.getcwd(), "tests", "login_demo.mp4")):
-                self.create_video_report(
+                self.queue_video_report(
                     video_name="login_demo", test_status="❌ **TEST FAILURE**"
                 )
             raise e
@@ -1478,7 +4732,8 @@ class FrontEndTest:
         try:
             # User is already logged in from shared session
             await self.handle_update_user()
-            video_path = self.create_video_report(video_name="user_preferences_demo")
+            await self.check_verifications()
+            video_path = self.queue_video_report(video_name="user_preferences_demo")
             logging.info(
                 f"User preferences test complete. Video report created at {video_path}"
             )
@@ -1487,7 +4742,7 @@ class FrontEndTest:
             if not os.path.exists(
                 os.path.join(os.getcwd(), "tests", "user_preferences_demo.mp4")
             ):
-                self.create_video_report(
+                self.queue_video_report(
                     video_name="user_preferences_demo",
                     test_status="❌ **TEST FAILURE**",
                 )
@@ -1505,7 +4760,8 @@ class FrontEndTest:
         try:
             # User is already logged in from shared session
             await self.handle_invite_user()
-            video_path = self.create_video_report(video_name="team_management_demo")
+            await self.check_verifications()
+            video_path = self.queue_video_report(video_name="team_management_demo")
             logging.info(
                 f"Team management test complete. Video report created at {video_path}"
             )
@@ -1514,7 +4770,7 @@ class FrontEndTest:
             if not os.path.exists(
                 os.path.join(os.getcwd(), "tests", "team_management_demo.mp4")
             ):
-                self.create_video_report(
+                self.queue_video_report(
                     video_name="team_management_demo", test_status="❌ **TEST FAILURE**"
                 )
             raise e
@@ -1524,12 +4780,13 @@ class FrontEndTest:
         try:
             # User is already logged in from shared session
             await self.handle_chat()
-            video_path = self.create_video_report(video_name="chat_demo")
+            await self.check_verifications()
+            video_path = self.queue_video_report(video_name="chat_demo")
             logging.info(f"Chat test complete. Video report created at {video_path}")
         except Exception as e:
             logging.error(f"Chat test failed: {e}")
             if not os.path.exists(os.path.join(os.getcwd(), "tests", "chat_demo.mp4")):
-                self.create_video_report(
+                self.queue_video_report(
                     video_name="chat_demo", test_status="❌ **TEST FAILURE**"
                 )
             raise e
@@ -1540,7 +4797,8 @@ class FrontEndTest:
             # User is already logged in from shared session
             await self.handle_train_user_agent()
             await self.handle_train_company_agent()
-            video_path = self.create_video_report(video_name="training_demo")
+            await self.check_verifications()
+            video_path = self.queue_video_report(video_name="training_demo")
             logging.info(
                 f"Training test complete. Video report created at {video_path}"
             )
@@ -1549,7 +4807,7 @@ class FrontEndTest:
             if not os.path.exists(
                 os.path.join(os.getcwd(), "tests", "training_demo.mp4")
             ):
-                self.create_video_report(
+                self.queue_video_report(
                     video_name="training_demo", test_status="❌ **TEST FAILURE**"
                 )
             raise e
@@ -1558,14 +4816,15 @@ class FrontEndTest:
         """Run Stripe subscription test and create video"""
         try:
             await self.handle_stripe()
-            video_path = self.create_video_report(video_name="stripe_demo")
+            await self.check_verifications()
+            video_path = self.queue_video_report(video_name="stripe_demo")
             logging.info(f"Stripe test complete. Video report created at {video_path}")
         except Exception as e:
             logging.error(f"Stripe test failed: {e}")
             if not os.path.exists(
                 os.path.join(os.getcwd(), "tests", "stripe_demo.mp4")
             ):
-                self.create_video_report(
+                self.queue_video_report(
                     video_name="stripe_demo", test_status="❌ **TEST FAILURE**"
                 )
             raise e
@@ -1578,7 +4837,8 @@ class FrontEndTest:
                 "Navigate to the abilities page to view and manage agent capabilities",
                 lambda: self.page.goto(f"{self.base_uri}/abilities"),
             )
-            video_path = self.create_video_report(video_name="abilities_demo")
+            await self.check_verifications()
+            video_path = self.queue_video_report(video_name="abilities_demo")
             logging.info(
                 f"Abilities test complete. Video report created at {video_path}"
             )
@@ -1587,7 +4847,7 @@ class FrontEndTest:
             if not os.path.exists(
                 os.path.join(os.getcwd(), "tests", "abilities_demo.mp4")
             ):
-                self.create_video_report(
+                self.queue_video_report(
                     video_name="abilities_demo", test_status="❌ **TEST FAILURE**"
                 )
             raise e
@@ -1599,7 +4859,8 @@ class FrontEndTest:
             # Call our handler that properly tests the mandatory context feature
             await self.handle_mandatory_context()
 
-            video_path = self.create_video_report(video_name="mandatory_context_demo")
+            await self.check_verifications()
+            video_path = self.queue_video_report(video_name="mandatory_context_demo")
             logging.info(
                 f"Mandatory context test complete. Video report created at {video_path}"
             )
@@ -1608,7 +4869,7 @@ class FrontEndTest:
             if not os.path.exists(
                 os.path.join(os.getcwd(), "tests", "mandatory_context_demo.mp4")
             ):
-                self.create_video_report(
+                self.queue_video_report(
                     video_name="mandatory_context_demo",
                     test_status="❌ **TEST FAILURE**",
                 )
@@ -1704,7 +4965,8 @@ class FrontEndTest:
         try:
             # User is already logged in from shared session
             await self.handle_provider_settings()
-            video_path = self.create_video_report(video_name="provider_settings_demo")
+            await self.check_verifications()
+            video_path = self.queue_video_report(video_name="provider_settings_demo")
             logging.info(
                 f"Provider settings test complete. Video report created at {video_path}"
             )
@@ -1713,7 +4975,7 @@ class FrontEndTest:
             if not os.path.exists(
                 os.path.join(os.getcwd(), "tests", "provider_settings_demo.mp4")
             ):
-                self.create_video_report(
+                self.queue_video_report(
                     video_name="provider_settings_demo",
                     test_status="❌ **TEST FAILURE**",
                 )
@@ -1728,8 +4990,8 @@ class FrontEndTest:
             lambda: self.page.click('text="New Chat"'),
         )
 
-        # Wait a couple seconds for the chat interface to settle
-        await asyncio.sleep(3)
+        # Wait for the chat interface to settle
+        await self.wait_until_visually_stable(max_wait=3)
 
         await self.test_action(
             "The chat interface is now ready. This is your central hub for interacting with your 'A G I X T' agent. Notice the clean, intuitive design that makes it easy to start conversations.",
@@ -1764,10 +5026,11 @@ class FrontEndTest:
         )
 
         # Wait for the extensions page to load completely
-        await asyncio.sleep(3)
+        frame = await self.wait_until_visually_stable(max_wait=3)
 
         await self.take_screenshot(
-            "Here we can see all the available extensions that can enhance our AI's capabilities."
+            "Here we can see all the available extensions that can enhance our AI's capabilities.",
+            frame=frame,
         )
 
         # Navigate to Abilities
@@ -1777,10 +5040,11 @@ class FrontEndTest:
         )
 
         # Wait for the abilities page to load
-        await asyncio.sleep(3)
+        frame = await self.wait_until_visually_stable(max_wait=3)
 
         await self.take_screenshot(
-            "This is the abilities dashboard where we can control what our 'A G I X T' agent can do."
+            "This is the abilities dashboard where we can control what our 'A G I X T' agent can do.",
+            frame=frame,
         )
 
         # Scroll down to make the "Run Data Analysis" option visible
@@ -1994,7 +5258,8 @@ class FrontEndTest:
         try:
             # User is already logged in from shared session
             await self.handle_extensions_demo()
-            video_path = self.create_video_report(video_name="extensions_demo")
+            await self.check_verifications()
+            video_path = self.queue_video_report(video_name="extensions_demo")
             logging.info(
                 f"Extensions demo test complete. Video report created at {video_path}"
             )
@@ -2003,15 +5268,322 @@ class FrontEndTest:
             if not os.path.exists(
                 os.path.join(os.getcwd(), "tests", "extensions_demo.mp4")
             ):
-                self.create_video_report(
+                self.queue_video_report(
                     video_name="extensions_demo", test_status="❌ **TEST FAILURE**"
                 )
             raise e
 
+    def shard_scenarios(self):
+        """Returns the (name, runner method) scenarios of this shard, split by expected wall time from recorded timings"""
+        names = [name for name, _ in self.SCENARIOS]
+        unknown = [name for name in self.scenario_names if name not in names]
+        if unknown:
+            raise Exception(
+                f"Unknown scenarios {', '.join(unknown)}, options are {', '.join(names)}"
+            )
+        if self.scenario_names:
+            names = [name for name in names if name in self.scenario_names]
+        shards = plan_shards(
+            names, load_scenario_timings(self.scenario_timings_path), self.shard_count
+        )
+        return [
+            (name, method_name)
+            for name, method_name in self.SCENARIOS
+            if name in shards[self.shard_index - 1]
+        ]
+
+    async def record_scenario(self, name, runner, email, mfa_token):
+        """
+        Runs a scenario and records its outcome and duration in the shard results
+
+        Args:
+            name (str): Scenario name
+            runner (callable): Scenario runner method (async)
+            email (str): Email of the registered test user
+            mfa_token (str): MFA secret of the registered test user
+        """
+        self.scenario_name = name
+        start = time.time()
+        try:
+            await runner(email, mfa_token)
+            await self.finish_scenario()
+            self.scenario_results.append(
+                {"name": name, "status": "passed", "seconds": time.time() - start}
+            )
+        except Exception as e:
+            self.scenario_results.append(
+                {
+                    "name": name,
+                    "status": "failed",
+                    "seconds": time.time() - start,
+                    "error": str(e),
+                }
+            )
+            raise
+
+    def write_results(self, error=None):
+        """
+        Writes this shard's results file for merge_shard_results
+
+        Args:
+            error (Exception): Error that stopped the run, if any
+        """
+        results = {
+            "shard": f"{self.shard_index}/{self.shard_count}",
+            "passed": error is None
+            and all(r["status"] == "passed" for r in self.scenario_results),
+            "seconds": time.time() - self.run_started,
+            "scenarios": self.scenario_results,
+            "errors": [str(error)] if error else [],
+        }
+        os.makedirs(os.path.dirname(self.results_path), exist_ok=True)
+        with open(self.results_path, "w") as f:
+            json.dump(results, f, indent=2)
+        logging.info(f"Shard results written to {self.results_path}")
+
+    async def run_route_benchmark(self):
+        """Benchmarks the load performance of each route with the logged in session and fails on budget regressions"""
+        benchmark = RouteBenchmark()
+        # Its own settler, so benchmark loads stay out of the settle summary of the test steps
+        settler = PageSettler()
+        logging.info(
+            f"Benchmarking {len(benchmark.routes)} routes, {benchmark.runs} cold and {benchmark.runs} warm loads each"
+        )
+        results = await benchmark.run(
+            self.browser,
+            self.base_uri,
+            await self.authenticated_storage_state(),
+            lambda page: settler.wait(page, "benchmark"),
+            {"viewport": {"width": 1367, "height": 924}},
+        )
+        benchmark.check(results)
+
+    async def run_chat_benchmark(self):
+        """Measures how fast chat answers stream in and writes the percentiles to tests/chat_benchmark_results.json"""
+        benchmark = ChatStreamBenchmark()
+        results = await benchmark.run(self.page, self.base_uri)
+        results_path = os.path.join(os.getcwd(), "tests", "chat_benchmark_results.json")
+        os.makedirs(os.path.dirname(results_path), exist_ok=True)
+        with open(results_path, "w") as f:
+            json.dump(results, f, indent=2)
+        lines = [f"{'metric':<26}{'p50':>12}{'p90':>12}{'p95':>12}"]
+        for metric, stats in results["summary"].items():
+            if stats["p50"] is not None:
+                lines.append(
+                    f"{metric:<26}{stats['p50']:>12.1f}{stats['p90']:>12.1f}{stats['p95']:>12.1f}"
+                )
+        logging.info(
+            f"Chat streaming over {benchmark.runs} runs (results in {results_path}):\n"
+            + "\n".join(lines)
+        )
+
+    async def run_load_test(self, email, mfa_token):
+        """
+        Ramps up LOAD_USERS virtual users over LOAD_RAMP_SECONDS, each in its own logged in
+        BrowserContext running the handlers named in LOAD_SCRIPT one after another. Request
+        latencies, error rates, WebSocket activity and step timings go to tests/load_results.json,
+        and the run fails when the request or step error rate exceeds LOAD_MAX_ERROR_RATE.
+
+        Virtual users share the test account and one browser, so size the machine for the
+        number of users. Screenshots are off unless LOAD_SCREENSHOTS is true, and no videos
+        are rendered.
+
+        Args:
+            email (str): Email of the registered test user, for handle_login steps
+            mfa_token (str): MFA secret of the registered test user, for handle_login steps
+        """
+        users = int(os.getenv("LOAD_USERS", "50"))
+        ramp_seconds = float(os.getenv("LOAD_RAMP_SECONDS", "60"))
+        script = [
+            step.strip()
+            for step in os.getenv(
+                "LOAD_SCRIPT", "navigate_to_chat_first,handle_chat"
+            ).split(",")
+            if step.strip()
+        ]
+        screenshots = os.getenv("LOAD_SCREENSHOTS", "false").lower() == "true"
+        max_error_rate = float(os.getenv("LOAD_MAX_ERROR_RATE", "0.05"))
+        unknown = [step for step in script if not hasattr(self, step)]
+        if unknown:
+            raise Exception(f"Unknown load script steps: {', '.join(unknown)}")
+        recorder = LoadRecorder()
+        logging.info(
+            f"Ramping up {users} virtual users over {ramp_seconds}s running: {', '.join(script)}"
+        )
+
+        async def virtual_user(index):
+            await asyncio.sleep(ramp_seconds * index / max(users, 1))
+            start = time.monotonic()
+            try:
+                user = await self.scenario_session(f"load_user_{index}", reports=False)
+            except Exception as e:
+                recorder.step("new_session", time.monotonic() - start, e)
+                logging.warning(f"Virtual user {index} could not start: {e}")
+                return
+            user.capture_screenshots = screenshots
+            user.display_screenshots = False
+            user.stream_reports = False
+            user.scenario_name = "load_test"
+            recorder.attach(user.page)
+            recorder.user_active(1)
+            steps = [("open_chat", lambda: user.page.goto(f"{self.base_uri}/chat"))]
+            for step in script:
+                if step == "handle_login":
+                    steps.append((step, lambda: user.handle_login(email, mfa_token)))
+                else:
+                    steps.append((step, getattr(user, step)))
+            try:
+                for step, handler in steps:
+                    start = time.monotonic()
+                    try:
+                        await handler()
+                    except Exception as e:
+                        recorder.step(step, time.monotonic() - start, e)
+                        logging.warning(f"Virtual user {index} failed {step}: {e}")
+                        break
+                    recorder.step(step, time.monotonic() - start)
+            finally:
+                recorder.user_active(-1)
+                await user.context.close()
+
+        await asyncio.gather(
+            *[virtual_user(index) for index in range(users)], return_exceptions=True
+        )
+        report = recorder.report()
+        report["config"] = {
+            "users": users,
+            "ramp_seconds": ramp_seconds,
+            "script": script,
+            "screenshots": screenshots,
+        }
+        results_path = os.path.join(os.getcwd(), "tests", "load_results.json")
+        os.makedirs(os.path.dirname(results_path), exist_ok=True)
+        with open(results_path, "w") as f:
+            json.dump(report, f, indent=2)
+        lines = [f"{'':<48}{'count':>8}{'errors':>8}{'p50':>10}{'p95':>10}{'p99':>10}"]
+        rows = [("all requests (ms)", report["requests"])]
+        rows += [(f"{step} (s)", stats) for step, stats in report["steps"].items()]
+        rows += sorted(
+            report["endpoints"].items(), key=lambda item: -(item[1]["p95"] or 0)
+        )[:10]
+        for name, stats in rows:
+            lines.append(
+                f"{name[:48]:<48}{stats['count']:>8}{stats['errors']:>8}"
+                + "".join(
+                    f"{stats[key]:>10.1f}" if stats[key] is not None else f"{'-':>10}"
+                    for key in ("p50", "p95", "p99")
+                )
+            )
+        logging.info(
+            f"Load test with {users} users, websockets {report['websockets']} (results in {results_path}):\n"
+            + "\n".join(lines)
+        )
+        failing = [
+            f"{name} error rate {stats['error_rate']:.1%}"
+            for name, stats in [("requests", report["requests"])]
+            + list(report["steps"].items())
+            if stats["error_rate"] > max_error_rate
+        ]
+        if failing:
+            raise Exception(
+                f"Load test exceeded the {max_error_rate:.1%} error rate: {', '.join(failing)}"
+            )
+
+    async def scenario_session(self, name, authenticated=True, reports=True):
+        """
+        Returns a copy of this test bound to its own BrowserContext and page.
+
+        The copy has its own screenshot list, frame store and screenshot directory, and shares
+        the browser, report workers and upload queue with this test.
+
+        Args:
+            name (str): Scenario name, used for the screenshot directory
+            authenticated (bool): Start the context logged in from the storage state snapshot
+            reports (bool): Start the report workers, sessions that never render a report skip them
+        """
+        storage_state = (
+            await self.authenticated_storage_state() if authenticated else None
+        )
+        if reports:
+            self.start_report_pool()
+        scenario = copy.copy(self)
+        scenario.screenshots_dir = os.path.join(self.screenshots_dir, name)
+        os.makedirs(scenario.screenshots_dir, exist_ok=True)
+        scenario.context = await self.browser.new_context(
+            storage_state=storage_state,
+            viewport={"width": 1367, "height": 924},
+        )
+        await self.backend_traffic.attach(
+            scenario.context, lambda: scenario.scenario_name
+        )
+        scenario.page = await scenario.context.new_page()
+        scenario.page.on("console", print_args)
+        scenario.page.set_default_timeout(60000)
+        scenario.popup = None
+        scenario.screenshots_with_actions = []
+        scenario.frame_store = FrameStore(
+            self.frame_store.max_size_mb, self.frame_store.keep_screenshots
+        )
+        scenario.report_stream = None
+        scenario.report_regions = {}
+        scenario.pending_verifications = []
+        return scenario
+
+    async def run_scenarios(self, email, mfa_token):
+        """
+        Runs the post-login scenarios one after another on the shared page, or with
+        SCENARIO_CONCURRENCY above 1, concurrently in isolated BrowserContexts that each
+        produce their own report.
+
+        Concurrent scenarios share one account, so server-side settings changed by one
+        scenario (such as mandatory context) can show up in another scenario's responses.
+
+        Args:
+            email (str): Email of the registered test user
+            mfa_token (str): MFA secret of the registered test user
+        """
+        scenarios = self.shard_scenarios()
+        logging.info(
+            f"Shard {self.shard_index}/{self.shard_count} runs: {', '.join(name for name, _ in scenarios) or 'no scenarios'}"
+        )
+        if self.scenario_concurrency <= 1:
+            for name, method_name in scenarios:
+                self.reset_screenshots()
+                await self.record_scenario(
+                    name, getattr(self, method_name), email, mfa_token
+                )
+            return
+
+        semaphore = asyncio.Semaphore(self.scenario_concurrency)
+
+        async def run_scenario(name, method_name):
+            async with semaphore:
+                logging.info(f"=== Starting {name} scenario ===")
+                scenario = await self.scenario_session(name)
+                try:
+                    await scenario.record_scenario(
+                        name, getattr(scenario, method_name), email, mfa_token
+                    )
+                finally:
+                    await scenario.context.close()
+
+        results = await asyncio.gather(
+            *[run_scenario(name, method_name) for name, method_name in scenarios],
+            return_exceptions=True,
+        )
+        failures = [
+            f"{name}: {result}"
+            for (name, _), result in zip(scenarios, results)
+            if isinstance(result, Exception)
+        ]
+        if failures:
+            raise Exception(f"Scenarios failed: {'; '.join(failures)}")
+
     async def run(self, headless=not is_desktop()):
         """Run all tests: registration in its own browser, then all others in a shared browser"""
         email = None
         mfa_token = None
+        self.run_started = time.time()
 
         try:
             # PHASE 1: Registration test in its own browser
@@ -2019,6 +5591,7 @@ class FrontEndTest:
             async with async_playwright() as playwright:
                 browser = await playwright.chromium.launch(headless=headless)
                 context = await browser.new_context()
+                await self.backend_traffic.attach(context, lambda: self.scenario_name)
                 page = await context.new_page()
                 page.on("console", print_args)
                 page.set_default_timeout(60000)  # Increase to 60 seconds
@@ -2031,7 +5604,12 @@ class FrontEndTest:
                 self.page = page
 
                 # Run registration test
-                email, mfa_token = await self.run_registration_test()
+                # Every shard registers its own user, only the first reports it
+                self.scenario_name = "registration_demo"
+                email, mfa_token = await self.run_registration_test(
+                    report=self.shard_index == 1
+                )
+                await self.finish_scenario()
 
                 # Close registration browser
                 await browser.close()
@@ -2043,61 +5621,73 @@ class FrontEndTest:
                 self.browser = await self.playwright.chromium.launch(headless=headless)
                 self.context = await self.browser.new_context()
                 self.page = await self.browser.new_page()
+                await self.backend_traffic.attach(
+                    self.page.context, lambda: self.scenario_name
+                )
                 self.page.on("console", print_args)
                 self.page.set_default_timeout(60000)  # Increase to 60 seconds
                 await self.page.set_viewport_size({"width": 1367, "height": 924})
 
                 # Start with login to establish session
                 # Clear screenshots for first video in shared session
-                self.screenshots_with_actions = []
+                self.reset_screenshots()
 
                 # Login test (start the shared session)
-                await self.run_login_test(email, mfa_token)
+                self.scenario_name = "login_demo"
+                await self.run_login_test(
+                    email, mfa_token, report=self.shard_index == 1
+                )
+                await self.finish_scenario()
                 logging.info("=== Login Complete - Continuing with other tests ===")
 
-                # Clear screenshots for next video
-                self.screenshots_with_actions = []
-
-                # Extensions test
-                await self.run_extensions_demo_test(email, mfa_token)
-                self.screenshots_with_actions = []
-
-                # Mandatory context test
-                await self.run_mandatory_context_test(email, mfa_token)
-
-                # Clear screenshots for next video
-                self.screenshots_with_actions = []
-
-                # Chat test
-                await self.run_chat_test(email, mfa_token)
-
-                # Clear screenshots for next video
-                self.screenshots_with_actions = []
-
-                # User preferences test
-                await self.run_user_preferences_test(email, mfa_token)
-
-                # Clear screenshots for next video
-                self.screenshots_with_actions = []
-
-                # Team management test
-                await self.run_team_management_test(email, mfa_token)
-
-                # Training test
-                # await self.run_training_test(email, mfa_token)
-
-                # Clear screenshots for next video
-                # self.screenshots_with_actions = []
+                if self.test_mode == "benchmark":
+                    self.scenario_name = "route_benchmark"
+                    await self.run_route_benchmark()
+                elif self.test_mode == "chat-benchmark":
+                    self.scenario_name = "chat_benchmark"
+                    await self.run_chat_benchmark()
+                elif self.test_mode == "load":
+                    await self.run_load_test(email, mfa_token)
+                else:
+                    # Extensions, mandatory context, chat, user preferences and team management tests
+                    await self.run_scenarios(email, mfa_token)
 
-                # Provider settings test
-                # await self.run_provider_settings_test(email, mfa_token)
+                    # Training test
+                    # await self.run_training_test(email, mfa_token)
 
-                # Stripe test (if enabled)
-                if "stripe" in self.features:
                     # Clear screenshots for next video
-                    self.screenshots_with_actions = []
-                    await self.run_stripe_test()
-
+                    # self.reset_screenshots()
+
+                    # Provider settings test
+                    # await self.run_provider_settings_test(email, mfa_token)
+
+                    # Stripe test (if enabled)
+                    if "stripe" in self.features and self.shard_index == 1:
+                        # Clear screenshots for next video
+                        self.reset_screenshots()
+                        self.scenario_name = "stripe_demo"
+                        await self.run_stripe_test()
+                        await self.finish_scenario()
+
+                await self.wait_for_reports()
+                self.write_results()
+                self.write_visual_report()
+                self.backend_traffic.save()
+                if self.verifier:
+                    self.verifier.save()
+                if self.backend_traffic.unmatched:
+                    logging.info(
+                        f"{self.backend_traffic.unmatched} backend requests had no recorded response"
+                    )
+                if self.settler.timings:
+                    settle_seconds = sum(t["seconds"] for t in self.settler.timings)
+                    unsettled = len(
+                        [t for t in self.settler.timings if not t["settled"]]
+                    )
+                    logging.info(
+                        f"Settle waits: {len(self.settler.timings)} waits, {settle_seconds:.1f}s total, {unsettled} reached the {self.settler.max_wait}s limit"
+                    )
+                self.log_time_sinks()
                 logging.info(
                     "=== All tests complete. Individual videos created for each feature area. ==="
                 )
@@ -2107,6 +5697,12 @@ class FrontEndTest:
 
         except Exception as e:
             logging.error(f"Test suite failed: {e}")
+            await self.wait_for_reports()
+            self.write_results(e)
+            self.write_visual_report()
+            self.backend_traffic.save()
+            # Where a failed run spent its time helps as much as where a green one did
+            self.log_time_sinks()
             if hasattr(self, "browser") and self.browser:
                 try:
                     await self.browser.close()
@@ -2119,8 +5715,55 @@ class TestRunner:
     def __init__(self):
         pass
 
-    def run(self, base_uri="http://localhost:3437"):
-        test = FrontEndTest(base_uri=base_uri)
+    def run_shards(self, base_uri="http://localhost:3437", processes=2, scenarios=""):
+        """
+        Runs every shard of the suite in its own worker process and merges their results
+
+        Args:
+            base_uri (str): Front end URI to test
+            processes (int): Number of shards, one worker process each
+            scenarios (str): Comma separated scenario names, all scenarios when empty
+        """
+        workers = []
+        results_paths = []
+        for index in range(1, processes + 1):
+            results_path = os.path.join(
+                TESTS_DIR, f"results_shard_{index}_of_{processes}.json"
+            )
+            results_paths.append(results_path)
+            workers.append(
+                subprocess.Popen(
+                    [
+                        sys.executable,
+                        os.path.abspath(__file__),
+                        "--base-uri",
+                        base_uri,
+                        "--shard",
+                        f"{index}/{processes}",
+                        "--scenarios",
+                        scenarios,
+                    ],
+                    env={**os.environ, "TEST_RESULTS_PATH": results_path},
+                )
+            )
+        return_codes = [worker.wait() for worker in workers]
+        merged = merge_shard_results(
+            [path for path in results_paths if os.path.exists(path)],
+            os.path.join(TESTS_DIR, "results.json"),
+        )
+        if any(return_codes) or not merged["passed"]:
+            sys.exit(1)
+        return merged
+
+    def run(self, base_uri="http://localhost:3437", shard="", scenarios=""):
+        test = FrontEndTest(base_uri=base_uri, shard=shard, scenarios=scenarios)
+        try:
+            self.run_test(test)
+        finally:
+            # Failure reports are queued for upload on the way out, send them before exiting
+            test.uploader.flush()
+
+    def run_test(self, test):
         try:
             if platform.system() == "Linux":
                 print("Linux Detected, using asyncio.run")
@@ -2170,3 +5813,64 @@ class TestRunner:
                 except Exception as video_error:
                     logging.error(f"Failed to create video report: {video_error}")
             sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the front end tests")
+    parser.add_argument("--base-uri", default="http://localhost:3437")
+    parser.add_argument(
+        "--shard", default="", help="Shard to run as index/count, such as 1/2"
+    )
+    parser.add_argument(
+        "--scenarios",
+        default="",
+        help=f"Comma separated scenarios to run, options are {', '.join(name for name, _ in FrontEndTest.SCENARIOS)}",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["scenarios", "benchmark", "chat-benchmark", "load"],
+        help="What runs after login, overrides TEST_MODE",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=0,
+        help="Run this many shards locally in worker processes and merge their results",
+    )
+    parser.add_argument(
+        "--merge",
+        nargs="+",
+        metavar="RESULTS",
+        help="Merge shard results files instead of running tests",
+    )
+    parser.add_argument(
+        "--output",
+        default=os.path.join(TESTS_DIR, "results.json"),
+        help="Merged results file",
+    )
+    parser.add_argument(
+        "--update-timings",
+        action="store_true",
+        help="Record merged scenario durations in the timings file used to balance shards",
+    )
+    args = parser.parse_args()
+    if args.mode:
+        os.environ["TEST_MODE"] = args.mode
+    if args.merge:
+        merged = merge_shard_results(
+            args.merge,
+            args.output,
+            timings_path=(
+                os.getenv(
+                    "SCENARIO_TIMINGS_PATH",
+                    os.path.join(TESTS_DIR, "scenario_timings.json"),
+                )
+                if args.update_timings
+                else None
+            ),
+        )
+        sys.exit(0 if merged["passed"] else 1)
+    elif args.processes > 0:
+        TestRunner().run_shards(args.base_uri, args.processes, args.scenarios)
+    else:
+        TestRunner().run(args.base_uri, args.shard, args.scenarios)
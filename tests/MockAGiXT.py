@@ -0,0 +1,677 @@
+"""
+Local stand-in for the AGiXT backend, so the front end tests can run offline and fast.
+
+Implements the parts of the REST, GraphQL and WebSocket API that the front end and
+tests/FrontEnd.py use: email + TOTP registration and login, the user, companies and
+agents, conversations, chat completions with a canned reply streamed over the
+conversation WebSocket, and agent prompts. Everything else answers with an empty
+success so pages render. Only the standard library is used.
+
+Run it, then point the front end (AGIXT_SERVER and NEXT_PUBLIC_AGIXT_SERVER) and the
+tests (AGIXT_URI) at it:
+
+    python tests/MockAGiXT.py --port 7437 --latency-ms 50 --first-token-ms 800
+
+Latency knobs, as arguments or environment variables:
+    MOCK_LATENCY_MS: delay added to every HTTP response
+    MOCK_FIRST_TOKEN_MS: delay between a chat request and the first streamed message
+    MOCK_STREAM_INTERVAL_MS: delay between streamed messages
+    MOCK_STREAM_CHUNKS: number of messages the reply is streamed in
+    MOCK_REPLY: canned assistant reply
+    MOCK_PROMPT_RESPONSE: canned agent prompt response, "True" passes screenshot checks
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import struct
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+DEFAULT_REPLY = """Here is a basic "hello world" example in Python:
+
+```python
+print("Hello, world!")
+```
+
+Save it as `hello.py` and run it with `python hello.py`."""
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def totp(secret, for_time=None, step=30, digits=6):
+    """
+    Returns the RFC 6238 TOTP code of a base32 secret
+
+    Args:
+        secret (str): Base32 encoded secret
+        for_time (float): Unix time to generate the code for, defaults to now
+        step (int): Seconds per code
+        digits (int): Code length
+    """
+    key = base64.b32decode(secret + "=" * (-len(secret) % 8), casefold=True)
+    counter = int((for_time if for_time is not None else time.time()) // step)
+    digest = hmac.new(key, struct.pack(">Q", counter), hashlib.sha1).digest()
+    offset = digest[-1] & 0x0F
+    code = (struct.unpack(">I", digest[offset : offset + 4])[0] & 0x7FFFFFFF) % (
+        10**digits
+    )
+    return str(code).zfill(digits)
+
+
+def parse_selection(query):
+    """
+    Parses a GraphQL query into nested {field: selection} dicts, ignoring arguments,
+    variables and aliases. Fields without a selection set map to None.
+
+    Args:
+        query (str): GraphQL query document
+    """
+    # Arguments never carry selections the mock needs, so drop them first
+    while "(" in query:
+        query = re.sub(r"\([^()]*\)", "", query)
+    tokens = re.findall(r"[A-Za-z_][A-Za-z0-9_]*|[{}]", query)
+    stack = [{}]
+    last = None
+    depth_started = False
+    for token in tokens:
+        if token == "{":
+            if not depth_started:
+                # Opening brace of the operation itself
+                depth_started = True
+                last = None
+                continue
+            selection = {}
+            stack[-1][last] = selection
+            stack.append(selection)
+            last = None
+        elif token == "}":
+            if len(stack) > 1:
+                stack.pop()
+        elif depth_started:
+            stack[-1][token] = None
+            last = token
+    return stack[0]
+
+
+def shape(value, selection):
+    """
+    Trims a resolved value down to the fields a GraphQL selection asks for
+
+    Args:
+        value: Resolved data, a dict, list or scalar
+        selection (dict): Selection from parse_selection, None for scalars
+    """
+    if selection is None or value is None:
+        return value
+    if isinstance(value, list):
+        return [shape(item, selection) for item in value]
+    return {field: shape(value.get(field), sub) for field, sub in selection.items()}
+
+
+class MockAGiXT:
+    """
+    In-memory state of the mock backend: users, tokens, conversations and open conversation WebSockets.
+
+    Args:
+        agent_name (str): Name of the single agent every user gets
+        reply (str): Canned assistant reply
+        prompt_response (str): Canned agent prompt response
+        first_token_ms (int): Delay before the first streamed message of a reply
+        stream_interval_ms (int): Delay between streamed messages of a reply
+        stream_chunks (int): Number of messages the reply is streamed in
+    """
+
+    def __init__(
+        self,
+        agent_name="XT",
+        reply=None,
+        prompt_response=None,
+        first_token_ms=None,
+        stream_interval_ms=None,
+        stream_chunks=None,
+    ):
+        self.agent_name = agent_name
+        self.reply = reply or os.getenv("MOCK_REPLY", DEFAULT_REPLY)
+        self.prompt_response = prompt_response or os.getenv(
+            "MOCK_PROMPT_RESPONSE", "True"
+        )
+        self.first_token_ms = (
+            first_token_ms
+            if first_token_ms is not None
+            else int(os.getenv("MOCK_FIRST_TOKEN_MS", "500"))
+        )
+        self.stream_interval_ms = (
+            stream_interval_ms
+            if stream_interval_ms is not None
+            else int(os.getenv("MOCK_STREAM_INTERVAL_MS", "200"))
+        )
+        self.stream_chunks = stream_chunks or int(os.getenv("MOCK_STREAM_CHUNKS", "4"))
+        self.signing_key = os.urandom(32)
+        self.users = {}
+        self.tokens = {}
+        self.conversations = {}
+        self.sockets = {}
+        self.lock = threading.Lock()
+
+    def register(self, email, first_name="", last_name=""):
+        """Creates a user with its own company and agent, or returns the existing one"""
+        with self.lock:
+            if email not in self.users:
+                company_id = str(uuid.uuid4())
+                self.users[email] = {
+                    "id": str(uuid.uuid4()),
+                    "email": email,
+                    "first_name": first_name,
+                    "last_name": last_name,
+                    "secret": base64.b32encode(os.urandom(20)).decode().rstrip("="),
+                    "company": {
+                        "id": company_id,
+                        "companyId": None,
+                        "name": f"{first_name or 'Test'}'s Company",
+                        "primary": True,
+                        "roleId": 1,
+                        "agents": [
+                            {
+                                "id": str(uuid.uuid4()),
+                                "companyId": company_id,
+                                "name": self.agent_name,
+                                "default": True,
+                                "status": True,
+                            }
+                        ],
+                    },
+                }
+            return self.users[email]
+
+    def issue_token(self, user):
+        """Returns a signed JWT for a user, valid for a day"""
+
+        def encode(data):
+            return (
+                base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+            )
+
+        signing_input = f"{encode({'alg': 'HS256', 'typ': 'JWT'})}.{encode({'sub': user['id'], 'email': user['email'], 'exp': int(time.time()) + 86400})}"
+        signature = (
+            base64.urlsafe_b64encode(
+                hmac.new(
+                    self.signing_key, signing_input.encode(), hashlib.sha256
+                ).digest()
+            )
+            .decode()
+            .rstrip("=")
+        )
+        token = f"{signing_input}.{signature}"
+        with self.lock:
+            self.tokens[token] = user["email"]
+        return token
+
+    def authenticate(self, authorization):
+        """Returns the user of an Authorization header or token, or None"""
+        token = (authorization or "").split(" ")[-1]
+        email = self.tokens.get(token)
+        return self.users.get(email) if email else None
+
+    def user_json(self, user):
+        """User as returned by GET /v1/user"""
+        return {
+            "id": user["id"],
+            "email": user["email"],
+            "first_name": user["first_name"],
+            "last_name": user["last_name"],
+            "companies": [user["company"]],
+            "missing_requirements": [],
+        }
+
+    def graphql_user(self, user):
+        """User as resolved by the GraphQL user field"""
+        return {
+            "id": user["id"],
+            "email": user["email"],
+            "firstName": user["first_name"] or "Test",
+            "lastName": user["last_name"],
+            "companies": [user["company"]],
+        }
+
+    def graphql(self, user, query, variables):
+        """
+        Resolves a GraphQL query against the user's data
+
+        Args:
+            user (dict): Authenticated user
+            query (str): GraphQL query document
+            variables (dict): Query variables
+        """
+        agent = dict(user["company"]["agents"][0], settings=[])
+        conversations = [
+            {
+                "id": conversation_id,
+                "name": conversation["name"],
+                "attachmentCount": 0,
+                "createdAt": conversation["created_at"],
+                "updatedAt": conversation["updated_at"],
+                "hasNotifications": False,
+                "summary": None,
+            }
+            for conversation_id, conversation in self.conversations.items()
+            if conversation["user_id"] == user["id"]
+        ]
+        resolvers = {
+            "user": self.graphql_user(user),
+            "agent": agent,
+            "conversations": {"edges": conversations},
+            "chains": [],
+            "chain": None,
+            "prompts": [],
+            "providers": [],
+            "provider": None,
+            "commandArgs": None,
+        }
+        selection = parse_selection(query)
+        return {
+            field: shape(resolvers.get(field), sub) for field, sub in selection.items()
+        }
+
+    def conversation(self, user, conversation_id, first_message=""):
+        """Returns the user's conversation, creating it when the id is unknown or '-'"""
+        with self.lock:
+            conversation = self.conversations.get(conversation_id)
+            if conversation is None or conversation["user_id"] != user["id"]:
+                conversation_id = str(uuid.uuid4())
+                conversation = {
+                    "id": conversation_id,
+                    "user_id": user["id"],
+                    "name": (first_message[:40] or "New Conversation"),
+                    "created_at": now_iso(),
+                    "updated_at": now_iso(),
+                    "messages": [],
+                }
+                self.conversations[conversation_id] = conversation
+            return conversation
+
+    def add_message(self, conversation, role, message):
+        """Appends a message to a conversation and pushes it to its open WebSockets"""
+        entry = {
+            "id": str(uuid.uuid4()),
+            "role": role,
+            "message": message,
+            "timestamp": now_iso(),
+        }
+        with self.lock:
+            conversation["messages"].append(entry)
+            conversation["updated_at"] = entry["timestamp"]
+            sockets = list(self.sockets.get(conversation["id"], []))
+        for socket in sockets:
+            socket.send_json({"type": "message_added", "data": entry})
+        return entry
+
+    def reply_chunks(self):
+        """Splits the canned reply at word boundaries into stream_chunks parts"""
+        words = self.reply.split(" ")
+        size = max(1, -(-len(words) // max(1, self.stream_chunks)))
+        return [
+            " ".join(words[start : start + size]) + " "
+            for start in range(0, len(words), size)
+        ]
+
+    def complete(self, user, request):
+        """
+        Answers a chat completion request: the user message is stored, then the canned
+        reply is streamed into the conversation as an activity followed by the answer in
+        several messages, and the OpenAI style completion is returned once the answer is
+        complete.
+
+        Args:
+            user (dict): Authenticated user
+            request (dict): Chat completion request body
+        """
+        content = request.get("messages", [{}])[-1].get("content", "")
+        if isinstance(content, list):
+            content = " ".join(
+                part.get("text", "") for part in content if part.get("type") == "text"
+            )
+        conversation = self.conversation(user, request.get("user") or "-", content)
+        self.add_message(conversation, "USER", content)
+        time.sleep(self.first_token_ms / 1000)
+        self.add_message(
+            conversation, self.agent_name, "[ACTIVITY] Thinking about the request."
+        )
+        for chunk in self.reply_chunks():
+            time.sleep(self.stream_interval_ms / 1000)
+            self.add_message(conversation, self.agent_name, chunk)
+        return {
+            "id": conversation["id"],
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model") or self.agent_name,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": self.reply},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": len(content.split()),
+                "completion_tokens": len(self.reply.split()),
+                "total_tokens": len(content.split()) + len(self.reply.split()),
+            },
+        }
+
+
+class WebSocketConnection:
+    """Minimal RFC 6455 server side connection: unmasked text frames out, close and ping handling in"""
+
+    def __init__(self, handler):
+        self.rfile = handler.rfile
+        self.wfile = handler.wfile
+        self.lock = threading.Lock()
+        self.open = True
+
+    def send_frame(self, opcode, payload):
+        header = bytes([0x80 | opcode])
+        if len(payload) < 126:
+            header += bytes([len(payload)])
+        elif len(payload) < 65536:
+            header += bytes([126]) + struct.pack(">H", len(payload))
+        else:
+            header += bytes([127]) + struct.pack(">Q", len(payload))
+        with self.lock:
+            if not self.open:
+                return
+            try:
+                self.wfile.write(header + payload)
+                self.wfile.flush()
+            except OSError:
+                self.open = False
+
+    def send_json(self, data):
+        self.send_frame(0x1, json.dumps(data).encode())
+
+    def receive(self):
+        """Reads one frame and returns (opcode, payload), or (None, b"") when the socket closed"""
+        head = self.rfile.read(2)
+        if len(head) < 2:
+            return None, b""
+        opcode = head[0] & 0x0F
+        length = head[1] & 0x7F
+        if length == 126:
+            length = struct.unpack(">H", self.rfile.read(2))[0]
+        elif length == 127:
+            length = struct.unpack(">Q", self.rfile.read(8))[0]
+        mask = self.rfile.read(4) if head[1] & 0x80 else b"\0\0\0\0"
+        payload = bytes(
+            byte ^ mask[idx % 4] for idx, byte in enumerate(self.rfile.read(length))
+        )
+        return opcode, payload
+
+    def serve(self):
+        """Answers pings and returns once the client closes the connection"""
+        while self.open:
+            opcode, payload = self.receive()
+            if opcode is None or opcode == 0x8:
+                self.send_frame(0x8, payload[:2])
+                self.open = False
+            elif opcode == 0x9:
+                self.send_frame(0xA, payload)
+
+
+class MockAGiXTHandler(BaseHTTPRequestHandler):
+    mock = None
+    latency_ms = 0
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_cors_headers()
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_cors_headers(self):
+        self.send_header(
+            "Access-Control-Allow-Origin", self.headers.get("Origin") or "*"
+        )
+        self.send_header("Access-Control-Allow-Credentials", "true")
+        self.send_header(
+            "Access-Control-Allow-Methods", "GET, POST, PUT, PATCH, DELETE, OPTIONS"
+        )
+        self.send_header(
+            "Access-Control-Allow-Headers", "Authorization, Content-Type, authorization"
+        )
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return {}
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_cors_headers()
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PUT(self):
+        self.dispatch("PUT")
+
+    def do_PATCH(self):
+        self.dispatch("PATCH")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def dispatch(self, method):
+        url = urlparse(self.path)
+        path = url.path.rstrip("/") or "/"
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if self.headers.get("Upgrade", "").lower() == "websocket":
+            return self.websocket(path, query)
+        body = self.read_json() if method in ("POST", "PUT", "PATCH", "DELETE") else {}
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        try:
+            status, data = self.route(method, path, query, body)
+        except Exception as e:
+            logging.error(f"Mock AGiXT failed {method} {path}: {e}")
+            status, data = 500, {"detail": str(e)}
+        self.send_json(status, data)
+
+    def route(self, method, path, query, body):
+        """Returns (status, JSON body) for a REST or GraphQL request"""
+        mock = self.mock
+        if path == "/v1/user/exists":
+            return 200, query.get("email", "") in mock.users
+        if path == "/v1/user" and method == "POST":
+            user = mock.register(
+                body.get("email", ""),
+                body.get("first_name", ""),
+                body.get("last_name", ""),
+            )
+            otp_uri = f"otpauth://totp/AGiXT:{user['email']}?secret={user['secret']}&issuer=AGiXT"
+            return 200, {
+                "otp_uri": otp_uri,
+                "user_id": user["id"],
+                "detail": "User registered",
+            }
+        if path == "/v1/login" and method == "POST":
+            user = mock.users.get(body.get("email", ""))
+            code = str(body.get("token", ""))
+            if not user or code not in [
+                totp(user["secret"], time.time() + drift) for drift in (-30, 0, 30)
+            ]:
+                return 401, {"detail": "Invalid email or MFA code"}
+            token = mock.issue_token(user)
+            referrer = body.get("referrer") or "http://localhost:3437/chat"
+            return 200, {"detail": f"{referrer}?token={token}", "token": token}
+
+        user = mock.authenticate(
+            self.headers.get("Authorization") or query.get("authorization")
+        )
+        if user is None:
+            return 401, {"detail": "Not authenticated"}
+        if path == "/v1/user":
+            if method in ("PUT", "PATCH"):
+                for key in ("first_name", "last_name"):
+                    if key in body:
+                        user[key] = body[key]
+                return 200, {"detail": "User updated"}
+            return 200, mock.user_json(user)
+        if path == "/graphql":
+            return 200, {
+                "data": mock.graphql(
+                    user, body.get("query", ""), body.get("variables") or {}
+                )
+            }
+        if path == "/v1/chat/completions" and method == "POST":
+            return 200, mock.complete(user, body)
+        if re.fullmatch(r"/(api|v1)/agent/[^/]+/prompt", path) and method == "POST":
+            return 200, {"response": mock.prompt_response}
+        match = re.fullmatch(r"/v1/conversation/([^/]+)", path)
+        if match and method == "GET":
+            conversation = mock.conversations.get(match.group(1))
+            return 200, {
+                "conversation_history": conversation["messages"] if conversation else []
+            }
+        if path in ("/v1/conversations", "/api/conversations"):
+            return 200, {
+                "conversations": {
+                    conversation_id: {"name": conversation["name"]}
+                    for conversation_id, conversation in mock.conversations.items()
+                    if conversation["user_id"] == user["id"]
+                }
+            }
+        if path == "/v1/companies":
+            return 200, {"companies": [user["company"]]}
+        if path == "/api/agent":
+            return 200, {"agents": user["company"]["agents"]}
+        if re.fullmatch(r"/api/agent/[^/]+", path) and method == "GET":
+            return 200, {"agent": {"settings": {}, "commands": {}}}
+        if path.endswith("/extensions"):
+            return 200, {"extensions": []}
+        if path.startswith("/v1/invitations"):
+            if method == "POST":
+                return 200, {"id": str(uuid.uuid4()), **body}
+            return 200, {"invitations": []}
+        # Anything else succeeds empty so pages render
+        logging.info(f"Mock AGiXT has no handler for {method} {unquote(path)}")
+        return 200, {} if method == "GET" else {"detail": "OK"}
+
+    def websocket(self, path, query):
+        """Upgrades a /v1/conversation/{id}/stream request and streams the conversation's messages"""
+        match = re.fullmatch(r"/v1/conversation/([^/]+)/stream", path)
+        user = self.mock.authenticate(query.get("authorization"))
+        if not match or user is None:
+            self.send_json(401, {"detail": "Not authenticated"})
+            return
+        accept = base64.b64encode(
+            hashlib.sha1(
+                (self.headers["Sec-WebSocket-Key"] + WEBSOCKET_GUID).encode()
+            ).digest()
+        ).decode()
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+        conversation_id = match.group(1)
+        socket = WebSocketConnection(self)
+        conversation = self.mock.conversations.get(conversation_id)
+        with self.mock.lock:
+            self.mock.sockets.setdefault(conversation_id, []).append(socket)
+            history = list(conversation["messages"]) if conversation else []
+        for message in history:
+            socket.send_json({"type": "initial_message", "data": message})
+        try:
+            socket.serve()
+        finally:
+            with self.mock.lock:
+                self.mock.sockets[conversation_id].remove(socket)
+            self.close_connection = True
+
+
+def serve(port=7437, host="0.0.0.0", latency_ms=None, **options):
+    """
+    Starts the mock backend and returns the running server, call shutdown() to stop it
+
+    Args:
+        port (int): Port to listen on
+        host (str): Interface to bind
+        latency_ms (int): Delay added to every HTTP response. Defaults to MOCK_LATENCY_MS or 0.
+        options: Keyword arguments for MockAGiXT
+    """
+    handler = type(
+        "Handler",
+        (MockAGiXTHandler,),
+        {
+            "mock": MockAGiXT(**options),
+            "latency_ms": (
+                latency_ms
+                if latency_ms is not None
+                else int(os.getenv("MOCK_LATENCY_MS", "0"))
+            ),
+        },
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f"Mock AGiXT listening on http://{host}:{port}")
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the mock AGiXT backend")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=7437)
+    parser.add_argument("--latency-ms", type=int, default=None)
+    parser.add_argument("--first-token-ms", type=int, default=None)
+    parser.add_argument("--stream-interval-ms", type=int, default=None)
+    parser.add_argument("--stream-chunks", type=int, default=None)
+    parser.add_argument("--reply", default=None)
+    args = parser.parse_args()
+    server = serve(
+        args.port,
+        args.host,
+        args.latency_ms,
+        reply=args.reply,
+        first_token_ms=args.first_token_ms,
+        stream_interval_ms=args.stream_interval_ms,
+        stream_chunks=args.stream_chunks,
+    )
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
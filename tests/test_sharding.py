@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+from FrontEnd import merge_shard_results, parse_shard, plan_shards
+
+
+def test_parse_shard():
+    assert parse_shard("2/4") == (2, 4)
+    assert parse_shard(" 1 / 1 ") == (1, 1)
+    assert parse_shard("") == (1, 1)
+
+
+@pytest.mark.parametrize("shard", ["0/2", "3/2", "1/0", "a/b", "1-2"])
+def test_parse_shard_rejects_invalid_specs(shard):
+    with pytest.raises(Exception):
+        parse_shard(shard)
+
+
+def test_plan_shards_balances_expected_time():
+    timings = {"a": 100, "b": 90, "c": 60, "d": 30}
+    shards = plan_shards(["a", "b", "c", "d"], timings, 2)
+    assert sorted(sum(timings[name] for name in shard) for shard in shards) == [
+        130,
+        150,
+    ]
+    assert sorted(name for shard in shards for name in shard) == ["a", "b", "c", "d"]
+
+
+def test_plan_shards_keeps_suite_order_and_default_timing():
+    shards = plan_shards(["z", "y", "x"], {"x": 1000}, 2, default_seconds=10)
+    assert shards == [["x"], ["z", "y"]]
+
+
+def test_plan_shards_separates_anti_affinity_groups():
+    timings = {
+        "chat_demo": 900,
+        "extensions_demo": 840,
+        "mandatory_context_demo": 1000,
+    }
+    shards = plan_shards(list(timings), timings, 2)
+    assert not any({"chat_demo", "extensions_demo"} <= set(shard) for shard in shards)
+
+
+def test_plan_shards_single_shard_runs_everything():
+    assert plan_shards(["a", "b"], {}, 1) == [["a", "b"]]
+
+
+def write_shard(path, passed, seconds, scenarios, errors=None):
+    path.write_text(
+        json.dumps(
+            {
+                "passed": passed,
+                "seconds": seconds,
+                "scenarios": scenarios,
+                "errors": errors or [],
+            }
+        )
+    )
+    return str(path)
+
+
+def test_merge_shard_results(tmp_path):
+    first = write_shard(
+        tmp_path / "first.json",
+        True,
+        120,
+        [{"name": "chat_demo", "status": "passed", "seconds": 100.04}],
+    )
+    second = write_shard(
+        tmp_path / "second.json",
+        False,
+        200,
+        [{"name": "extensions_demo", "status": "failed", "seconds": 50}],
+        errors=["boom"],
+    )
+    timings_path = tmp_path / "timings.json"
+    timings_path.write_text(json.dumps({"extensions_demo": 840}))
+    output_path = tmp_path / "results.json"
+
+    merged = merge_shard_results(
+        [first, second], str(output_path), timings_path=str(timings_path)
+    )
+
+    assert merged["shards"] == 2
+    assert merged["passed"] is False
+    assert merged["wall_seconds"] == 200
+    assert [scenario["name"] for scenario in merged["scenarios"]] == [
+        "chat_demo",
+        "extensions_demo",
+    ]
+    assert merged["errors"] == ["boom"]
+    assert json.loads(output_path.read_text()) == merged
+    # Only passed scenarios update their expected duration
+    assert json.loads(timings_path.read_text()) == {
+        "chat_demo": 100.0,
+        "extensions_demo": 840,
+    }
+
+
+def test_merge_shard_results_without_timings(tmp_path):
+    only = write_shard(tmp_path / "only.json", True, 10, [])
+    merged = merge_shard_results([only], str(tmp_path / "results.json"))
+    assert merged["passed"] is True
+    assert merged["scenarios"] == []